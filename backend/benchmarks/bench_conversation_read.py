@@ -0,0 +1,89 @@
+"""
+CPU per request for reading and serializing a 1,000-message conversation.
+
+    python -m benchmarks.bench_conversation_read --messages 1000 --requests 200
+
+"iso" reproduces the old path: ISO strings in BSON, datetime.fromisoformat per
+field, validated pydantic models, jsonable_encoder + json.dumps (JSONResponse).
+"bson" is the current path: native BSON dates, model_construct and orjson.
+Both include BSON decoding of the stored documents. No database is needed.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+
+import bson
+import orjson
+from bson.codec_options import CodecOptions
+from fastapi.encoders import jsonable_encoder
+
+from models.conversation import Conversation, Message
+
+CODEC = CodecOptions(tz_aware=True)
+
+def _documents(count: int, iso: bool):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    as_stored = (lambda value: value.isoformat()) if iso else (lambda value: value)
+    conversation = {
+        "id": "c1",
+        "user_id": "u1",
+        "title": "Benchmark",
+        "started_at": as_stored(now),
+        "last_message_at": as_stored(now),
+        "message_count": count,
+        "summary": None,
+        "summarized_count": 0,
+        "tags": []
+    }
+    messages = [
+        {
+            "id": f"m{seq}",
+            "role": "user" if seq % 2 == 0 else "assistant",
+            "content": "A reasonably sized chat message about everyday things. " * 4,
+            "timestamp": as_stored(now),
+            "response_time_ms": None if seq % 2 == 0 else 850,
+            "seq": seq
+        }
+        for seq in range(count)
+    ]
+    return bson.encode(conversation), [bson.encode(msg) for msg in messages]
+
+def read_iso(raw_conversation: bytes, raw_messages: list) -> bytes:
+    conv_dict = bson.decode(raw_conversation, CODEC)
+    conv_dict['started_at'] = datetime.fromisoformat(conv_dict['started_at'])
+    conv_dict['last_message_at'] = datetime.fromisoformat(conv_dict['last_message_at'])
+    messages = []
+    for raw in raw_messages:
+        msg = bson.decode(raw, CODEC)
+        msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
+        messages.append(Message(**msg))
+    conversation = Conversation(**conv_dict, messages=messages)
+    return json.dumps(jsonable_encoder(conversation)).encode()
+
+def read_bson(raw_conversation: bytes, raw_messages: list) -> bytes:
+    conv_dict = bson.decode(raw_conversation, CODEC)
+    messages = [Message.model_construct(**bson.decode(raw, CODEC)) for raw in raw_messages]
+    conversation = Conversation.model_construct(**conv_dict, messages=messages)
+    return orjson.dumps(conversation.model_dump())
+
+def run(name: str, read, documents, requests: int):
+    read(*documents)  # warm-up
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        body = read(*documents)
+    cpu = (time.process_time() - cpu_start) / requests
+    print(f"{name:5s} cpu_per_request={cpu * 1000:.2f}ms body={len(body)} bytes")
+    return cpu
+
+def main(messages: int, requests: int):
+    before = run("iso", read_iso, _documents(messages, iso=True), requests)
+    after = run("bson", read_bson, _documents(messages, iso=False), requests)
+    print(f"speedup={before / after:.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    main(args.messages, args.requests)
@@ -0,0 +1,130 @@
+"""
+Compare the PyTorch and int8 ONNX Runtime embedding backends.
+
+    python -m benchmarks.bench_embedders --texts 512 --queries 200 --tolerance 0.98
+
+Each backend is measured in a fresh interpreter, so RSS reflects only what that
+backend loads: single-query latency (p50/p95), batch throughput and peak RSS.
+The parent then embeds the same texts with both and checks per-text cosine
+similarity; it exits with status 1 if any pair falls below --tolerance.
+Set EMBEDDING_ONNX_FILE to try another export (e.g. onnx/model_qint8_avx512_vnni.onnx).
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.embedders import OnnxEmbedder, SentenceTransformerEmbedder
+
+MODEL = 'all-MiniLM-L6-v2'
+BACKEND_DIR = Path(__file__).parent.parent
+
+SENTENCES = [
+    "What did I say about moving to Berlin last year?",
+    "hi",
+    "Remind me what my favourite books are.",
+    "The quarterly report shows revenue grew by twelve percent while costs stayed flat.",
+    "How do you feel about working remotely?",
+    "I usually go running in the morning before work, around six.",
+    "Can you summarize the document I uploaded about the marketing plan?",
+    "My sister's wedding is in June and I'm giving a speech.",
+    "Which programming languages do I know best?",
+    "Thanks, that's really helpful!",
+]
+
+def corpus(count: int) -> list:
+    """Deterministic mix of short queries and longer passages"""
+    rng = random.Random(7)
+    texts = []
+    for i in range(count):
+        parts = rng.sample(SENTENCES, rng.randint(1, 6))
+        texts.append(" ".join(parts) + f" ({i})")
+    return texts
+
+def _backend(name: str):
+    if name == "torch":
+        return SentenceTransformerEmbedder(MODEL)
+    return OnnxEmbedder(
+        MODEL,
+        os.environ.get('EMBEDDING_ONNX_FILE', 'onnx/model_quint8_avx2.onnx'),
+        int(os.environ.get('EMBEDDING_ONNX_THREADS', 0))
+    )
+
+def measure(name: str, texts: int, queries: int, batch_size: int) -> dict:
+    """Runs in the child process"""
+    embedder = _backend(name)
+    start = time.perf_counter()
+    embedder.load()
+    embedder.encode(["warm up"], batch_size=1)
+    load_seconds = time.perf_counter() - start
+
+    samples = corpus(queries)
+    latencies = []
+    for text in samples:
+        start = time.perf_counter()
+        embedder.encode([text], batch_size=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    batch = corpus(texts)
+    start = time.perf_counter()
+    embedder.encode(batch, batch_size=batch_size)
+    throughput = len(batch) / (time.perf_counter() - start)
+
+    return {
+        "backend": embedder.name,
+        "load_s": load_seconds,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "texts_per_s": throughput,
+        # ru_maxrss is in KiB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def parity(texts: int, batch_size: int) -> np.ndarray:
+    samples = corpus(texts)
+    reference = SentenceTransformerEmbedder(MODEL).encode(samples, batch_size=batch_size)
+    candidate = _backend("onnx").encode(samples, batch_size=batch_size)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    return np.sum(reference * candidate, axis=1)
+
+def main(texts: int, queries: int, batch_size: int, tolerance: float) -> int:
+    for name in ("torch", "onnx"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embedders", "--measure", name,
+             "--texts", str(texts), "--queries", str(queries), "--batch-size", str(batch_size)],
+            cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{result['backend']:45s} load={result['load_s']:.1f}s p50={result['p50_ms']:.1f}ms "
+            f"p95={result['p95_ms']:.1f}ms throughput={result['texts_per_s']:.0f}/s rss={result['rss_mb']:.0f}MB"
+        )
+
+    similarity = parity(texts, batch_size)
+    print(
+        f"cosine torch vs onnx: min={similarity.min():.4f} mean={similarity.mean():.4f} "
+        f"below {tolerance}: {int((similarity < tolerance).sum())}/{len(similarity)}"
+    )
+    return 0 if similarity.min() >= tolerance else 1
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=512)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--tolerance', type=float, default=0.98)
+    parser.add_argument('--measure', choices=["torch", "onnx"])
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.texts, args.queries, args.batch_size)))
+    else:
+        sys.exit(main(args.texts, args.queries, args.batch_size, args.tolerance))
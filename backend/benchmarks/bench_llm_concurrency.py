@@ -0,0 +1,55 @@
+"""
+Fire concurrent completions through LLMService and report latency and load shedding.
+
+    uvicorn benchmarks.llm_stub_server:app --port 9100 &
+    GROQ_BASE_URL=http://localhost:9100 GROQ_API_KEY=stub \
+        python -m benchmarks.bench_llm_concurrency --requests 500 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+from services.llm_service import llm_service, LLMOverloadedError
+
+async def _one(latencies: list, outcomes: dict):
+    start = time.perf_counter()
+    try:
+        await llm_service.generate_response(
+            [{"role": "user", "content": "Who are you?"}],
+            "You are a load test."
+        )
+        latencies.append(time.perf_counter() - start)
+        outcomes["ok"] += 1
+    except LLMOverloadedError:
+        outcomes["shed"] += 1
+    except Exception:
+        outcomes["error"] += 1
+
+async def main(total: int, concurrency: int):
+    latencies = []
+    outcomes = {"ok": 0, "shed": 0, "error": 0}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def gated():
+        async with gate:
+            await _one(latencies, outcomes)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(gated() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    await llm_service.close()
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0
+    print(f"requests={total} concurrency={concurrency} elapsed={elapsed:.2f}s")
+    print(f"ok={outcomes['ok']} shed={outcomes['shed']} error={outcomes['error']}")
+    print(f"throughput={outcomes['ok'] / elapsed:.1f} req/s")
+    print(f"p50={pct(0.5):.0f}ms p95={pct(0.95):.0f}ms p99={pct(0.99):.0f}ms")
+    print(f"stats={llm_service.get_stats()}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
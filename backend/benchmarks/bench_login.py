@@ -0,0 +1,64 @@
+"""
+Login throughput and event-loop stall, with bcrypt on the loop vs on the hashing executor.
+
+    python -m benchmarks.bench_login --logins 32
+
+"inline" reproduces the old behaviour (pwd_context.verify inside the handler),
+"executor" goes through AuthService.verify_and_update_password. A heartbeat
+coroutine ticking every 10 ms measures how long the loop is blocked.
+"""
+import argparse
+import asyncio
+import time
+
+from services.auth_service import auth_service, pwd_context
+
+async def _heartbeat(lags: list, stop: asyncio.Event, interval: float = 0.01):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def _inline_login(password: str, hashed: str):
+    return pwd_context.verify(password, hashed)
+
+async def _executor_login(password: str, hashed: str):
+    valid, _ = await auth_service.verify_and_update_password(password, hashed)
+    return valid
+
+async def run(mode: str, logins: int, hashed: str):
+    login = _inline_login if mode == "inline" else _executor_login
+    lags = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(login("password123", hashed) for _ in range(logins)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for r in results if r is True)
+
+    stop.set()
+    await heartbeat
+    lags.sort()
+    p99 = lags[int(0.99 * (len(lags) - 1))] * 1000 if lags else 0
+    print(
+        f"{mode:9s} logins={logins} ok={ok} shed={logins - ok} elapsed={elapsed:.2f}s "
+        f"throughput={ok / elapsed:.1f}/s loop_lag_p99={p99:.0f}ms "
+        f"loop_lag_max={max(lags, default=0) * 1000:.0f}ms"
+    )
+
+async def main(logins: int):
+    hashed = pwd_context.hash("password123")
+    await run("inline", logins, hashed)
+    await run("executor", logins, hashed)
+    print(f"stats={auth_service.get_stats()}")
+    auth_service.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
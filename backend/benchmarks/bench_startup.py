@@ -0,0 +1,74 @@
+"""
+Time from process start until the API is importable, live and ready.
+
+    python -m benchmarks.bench_startup --runs 3 --port 8765
+
+Each run imports `server` in a fresh interpreter, then starts uvicorn and
+polls /api/health/live (accepting connections) and /api/health/ready
+(MongoDB, Redis and the embedding model warm). Needs the same .env as the
+server; the model download is not included once it is in the local cache.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+def time_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import server"], cwd=BACKEND_DIR, check=True)
+    return time.perf_counter() - start
+
+def _wait_for(url: str, start: float, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(url)
+
+def time_serve(port: int, timeout: float) -> tuple:
+    base = f"http://127.0.0.1:{port}/api/health"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        deadline = start + timeout
+        live = _wait_for(f"{base}/live", start, deadline)
+        ready = _wait_for(f"{base}/ready", start, deadline)
+        return live, ready
+    finally:
+        process.terminate()
+        process.wait()
+
+def main(runs: int, port: int, timeout: float):
+    results = {"import": [], "live": [], "ready": []}
+    for run in range(runs):
+        results["import"].append(time_import())
+        live, ready = time_serve(port, timeout)
+        results["live"].append(live)
+        results["ready"].append(ready)
+        print(
+            f"run={run + 1} import={results['import'][-1]:.2f}s "
+            f"live={live:.2f}s ready={ready:.2f}s"
+        )
+    print(" ".join(
+        f"median_{name}={statistics.median(values):.2f}s" for name, values in results.items()
+    ))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+    main(args.runs, args.port, args.timeout)
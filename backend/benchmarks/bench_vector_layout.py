@@ -0,0 +1,154 @@
+"""
+Compare the per-user and sharded knowledge collection layouts.
+
+    python -m benchmarks.bench_vector_layout --users 1000 10000 100000 --chunks-per-user 5
+
+For each user count and layout, a fresh process builds a throwaway persistent
+Chroma store with random unit vectors (no embedding model needed), then runs
+--queries searches for random users through the same CollectionLayout code the
+service uses. Reports build time, search p50/p95 with cold and warm handle
+caches, RSS and on-disk size. 100k users in the per-user layout means 100k
+collections and takes a long time to build; that is the point of the comparison.
+"""
+import argparse
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.vector_layout import PerUserLayout, ShardedLayout
+
+BACKEND_DIR = Path(__file__).parent.parent
+DIMENSIONS = 384
+WRITE_BATCH = 5000
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def disk_mb(path: str) -> float:
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file()) / 1024 / 1024
+
+def _vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build(layout, users: list, chunks_per_user: int, rng: np.random.Generator):
+    """Write chunks_per_user chunks for every user, batching writes per collection"""
+    pending = {}
+    for user_id in users:
+        collection = layout.collection(user_id)
+        batch = pending.setdefault(collection.name, (collection, []))[1]
+        batch.extend((user_id, i) for i in range(chunks_per_user))
+        if len(batch) >= WRITE_BATCH or layout.name == "per_user":
+            _flush(collection, batch, rng)
+            batch.clear()
+    for collection, batch in pending.values():
+        if batch:
+            _flush(collection, batch, rng)
+
+def _flush(collection, batch: list, rng: np.random.Generator):
+    collection.upsert(
+        ids=[f"{user_id}:{i}" for user_id, i in batch],
+        embeddings=_vectors(rng, len(batch)).tolist(),
+        documents=[f"chunk {i} of {user_id}" for user_id, i in batch],
+        metadatas=[{"user_id": user_id, "knowledge_id": f"{user_id}-doc", "chunk": i} for user_id, i in batch]
+    )
+
+def search(layout, users: list, queries: int, top_k: int, rng: np.random.Generator) -> list:
+    latencies = []
+    for user_id, vector in zip(random.Random(1).choices(users, k=queries), _vectors(rng, queries)):
+        start = time.perf_counter()
+        results = layout.collection(user_id).query(
+            query_embeddings=[vector.tolist()],
+            n_results=top_k,
+            where=layout.where(user_id)
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert all(meta["user_id"] == user_id for meta in results["metadatas"][0])
+    latencies.sort()
+    return latencies
+
+def measure(layout_name: str, user_count: int, chunks_per_user: int, queries: int, shards: int, top_k: int) -> dict:
+    """Runs in the child process"""
+    import chromadb
+    from chromadb.config import Settings
+
+    path = tempfile.mkdtemp(prefix="bench_vector_layout_")
+    try:
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        if layout_name == "sharded":
+            layout = ShardedLayout(client, cache_size=user_count, shards=shards)
+        else:
+            layout = PerUserLayout(client, cache_size=user_count)
+        users = [f"user-{i:06d}" for i in range(user_count)]
+        rng = np.random.default_rng(7)
+        baseline = rss_mb()
+
+        start = time.perf_counter()
+        build(layout, users, chunks_per_user, rng)
+        build_seconds = time.perf_counter() - start
+
+        # Drop cached handles so the first pass pays the catalog lookups
+        layout._handles.clear()
+        cold = search(layout, users, queries, top_k, rng)
+        warm = search(layout, users, queries, top_k, rng)
+        return {
+            "layout": layout_name,
+            "users": user_count,
+            "collections": len(client.list_collections()),
+            "build_s": build_seconds,
+            "cold_p50_ms": statistics.median(cold),
+            "cold_p95_ms": cold[int(len(cold) * 0.95) - 1],
+            "warm_p50_ms": statistics.median(warm),
+            "warm_p95_ms": warm[int(len(warm) * 0.95) - 1],
+            "rss_mb": rss_mb() - baseline,
+            "disk_mb": disk_mb(path)
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+def main(user_counts: list, layouts: list, chunks_per_user: int, queries: int, shards: int, top_k: int):
+    for user_count in user_counts:
+        for layout_name in layouts:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_vector_layout", "--measure", layout_name,
+                 "--users", str(user_count), "--chunks-per-user", str(chunks_per_user),
+                 "--queries", str(queries), "--shards", str(shards), "--top-k", str(top_k)],
+                cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+            ).stdout
+            r = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{r['layout']:8s} users={r['users']:<7d} collections={r['collections']:<7d} "
+                f"build={r['build_s']:.0f}s cold p50/p95={r['cold_p50_ms']:.1f}/{r['cold_p95_ms']:.1f}ms "
+                f"warm p50/p95={r['warm_p50_ms']:.1f}/{r['warm_p95_ms']:.1f}ms "
+                f"rss=+{r['rss_mb']:.0f}MB disk={r['disk_mb']:.0f}MB",
+                flush=True
+            )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--layouts', nargs='+', choices=["per_user", "sharded"], default=["per_user", "sharded"])
+    parser.add_argument('--chunks-per-user', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--measure', choices=["per_user", "sharded"])
+    args = parser.parse_args()
+    if args.measure:
+        print(json.dumps(measure(
+            args.measure, args.users[0], args.chunks_per_user, args.queries, args.shards, args.top_k
+        )))
+    else:
+        main(args.users, args.layouts, args.chunks_per_user, args.queries, args.shards, args.top_k)
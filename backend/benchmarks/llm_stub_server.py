@@ -0,0 +1,76 @@
+"""
+Local stand-in for the Groq chat completions API, used for load tests.
+
+    uvicorn benchmarks.llm_stub_server:app --port 9100
+    GROQ_BASE_URL=http://localhost:9100 GROQ_API_KEY=stub uvicorn server:app
+
+STUB_LATENCY_MS sets the delay before the first token, STUB_TOKEN_DELAY_MS the
+delay between streamed tokens and STUB_TOKENS the number of tokens per reply.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+app = FastAPI(title="LLM Stub Server")
+
+LATENCY_MS = int(os.environ.get('STUB_LATENCY_MS', 300))
+TOKEN_DELAY_MS = int(os.environ.get('STUB_TOKEN_DELAY_MS', 20))
+TOKENS = int(os.environ.get('STUB_TOKENS', 50))
+
+def _completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex}"
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    words = [f"token{i} " for i in range(TOKENS)]
+
+    if not body.get("stream"):
+        await asyncio.sleep((LATENCY_MS + TOKEN_DELAY_MS * TOKENS) / 1000)
+        return {
+            "id": _completion_id(),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": TOKENS, "total_tokens": TOKENS}
+        }
+
+    async def event_stream():
+        completion_id = _completion_id()
+        await asyncio.sleep(LATENCY_MS / 1000)
+        for i, word in enumerate(words):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": word} if i == 0 else {"content": word},
+                    "finish_reason": None
+                }]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_DELAY_MS / 1000)
+
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -0,0 +1,61 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.auth_service import auth_service
+from services.rate_limiter import rate_limiter, RateLimiter
+from typing import Optional, Tuple
+
+class RateLimitMiddleware:
+    """ASGI middleware that enforces RateLimiter rules before the route runs"""
+    
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+    
+    def _identity(self, scope: Scope) -> Tuple[str, Optional[str]]:
+        """Authenticated user id if the bearer token is valid, else client address"""
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                user_id = auth_service.verify_token(authorization[7:]).get("sub")
+                if user_id:
+                    return f"user:{user_id}", user_id
+            except Exception:
+                pass
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", None
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        
+        rule = self.limiter.match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        
+        identity, user_id = self._identity(scope)
+        decision = await self.limiter.hit(rule, identity, user_id)
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = decision.headers()
+        if not decision.allowed:
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers=headers
+            )
+            await response(scope, receive, send)
+            return
+        
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers.append(name, value)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
@@ -13,6 +13,8 @@ class Message(BaseModel):
     video_url: Optional[str] = None
     audio_url: Optional[str] = None
     response_time_ms: Optional[int] = None
+    time_to_first_token_ms: Optional[int] = None
+    seq: Optional[int] = None  # position in the conversation, assigned when stored
 
 class Conversation(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -25,6 +27,7 @@ class Conversation(BaseModel):
     last_message_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     message_count: int = 0
     summary: Optional[str] = None
+    summarized_count: int = 0  # oldest messages already folded into summary
     tags: List[str] = []
 
 class ConversationCreate(BaseModel):
@@ -41,4 +44,8 @@ class ConversationResponse(BaseModel):
     message_count: int
     started_at: datetime
     last_message_at: datetime
-    tags: List[str]
\ No newline at end of file
+    tags: List[str]
+
+class MessagePage(BaseModel):
+    messages: List[Message]
+    next_cursor: Optional[str] = None  # pass as `before` to get older messages
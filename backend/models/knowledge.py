@@ -12,6 +12,12 @@ class KnowledgeEntry(BaseModel):
     title: str
     content: str
     embedding_id: Optional[str] = None
+    chunk_count: int = 0
+    status: str = "ready"  # pending, processing, ready, failed
+    pages_total: Optional[int] = None
+    pages_done: List[int] = []  # pages already chunked and embedded
+    failed_pages: List[int] = []
+    error: Optional[str] = None
     file_path: Optional[str] = None
     tags: List[str] = []
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -29,4 +35,17 @@ class KnowledgeResponse(BaseModel):
     source: str
     title: str
     tags: List[str]
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    status: str = "ready"
+
+class KnowledgeUploadResponse(KnowledgeResponse):
+    job_id: str
+
+class KnowledgeStatusResponse(BaseModel):
+    id: str
+    status: str
+    pages_total: Optional[int] = None
+    pages_processed: int
+    chunk_count: int
+    failed_pages: List[int]
+    error: Optional[str] = None
\ No newline at end of file
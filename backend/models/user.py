@@ -39,6 +39,13 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserProfileUpdate(BaseModel):
+    """Fields a user may change; nested settings are validated before they are stored"""
+    name: Optional[str] = None
+    personality: Optional[PersonalityTraits] = None
+    preferences: Optional[UserPreferences] = None
+    onboarding_completed: Optional[bool] = None
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -1,8 +1,16 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
 from typing import Optional, List
 from models.avatar import Avatar
+from repositories.indexes import index_registry
+from services.cache_service import cache_service, cache_key, cached
 from datetime import datetime
 
+index_registry.add_index("avatars", [("id", ASCENDING)], name="id_unique", unique=True)
+index_registry.add_index("avatars", [("user_id", ASCENDING)], name="user_id")
+index_registry.add_query("avatars.find_by_id", "avatars", {"id": "<id>"})
+index_registry.add_query("avatars.find_by_user", "avatars", {"user_id": "<user_id>"})
+
 class AvatarRepository:
     """Repository for Avatar data operations"""
     
@@ -12,42 +20,55 @@ class AvatarRepository:
     
     async def create(self, avatar: Avatar) -> Avatar:
         """Create a new avatar"""
-        avatar_dict = avatar.model_dump()
-        avatar_dict['created_at'] = avatar_dict['created_at'].isoformat()
-        avatar_dict['updated_at'] = avatar_dict['updated_at'].isoformat()
-        
-        await self.collection.insert_one(avatar_dict)
+        await self.collection.insert_one(avatar.model_dump())
+        # Lookups made before the avatar existed are cached as None
+        await self._invalidate(avatar.id, avatar.user_id)
         return avatar
     
+    @cached("avatar", ttl=300, model=Avatar)
     async def find_by_id(self, avatar_id: str) -> Optional[Avatar]:
         """Find avatar by ID"""
         avatar_dict = await self.collection.find_one({"id": avatar_id}, {"_id": 0})
         if avatar_dict:
-            avatar_dict['created_at'] = datetime.fromisoformat(avatar_dict['created_at'])
-            avatar_dict['updated_at'] = datetime.fromisoformat(avatar_dict['updated_at'])
-            return Avatar(**avatar_dict)
+            return Avatar.model_construct(**avatar_dict)
         return None
     
+    @cached("avatar_by_user", ttl=300, model=Avatar)
     async def find_by_user(self, user_id: str) -> Optional[Avatar]:
         """Find avatar by user ID"""
         avatar_dict = await self.collection.find_one({"user_id": user_id}, {"_id": 0})
         if avatar_dict:
-            avatar_dict['created_at'] = datetime.fromisoformat(avatar_dict['created_at'])
-            avatar_dict['updated_at'] = datetime.fromisoformat(avatar_dict['updated_at'])
-            return Avatar(**avatar_dict)
+            return Avatar.model_construct(**avatar_dict)
         return None
     
     async def update(self, avatar_id: str, update_data: dict) -> bool:
         """Update avatar"""
         from datetime import timezone
-        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
-        result = await self.collection.update_one(
+        update_data['updated_at'] = datetime.now(timezone.utc)
+        previous = await self.collection.find_one_and_update(
             {"id": avatar_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"_id": 0, "user_id": 1}
         )
-        return result.modified_count > 0
+        if previous is None:
+            return False
+        await self._invalidate(avatar_id, previous["user_id"])
+        return True
     
     async def delete(self, avatar_id: str) -> bool:
         """Delete avatar"""
-        result = await self.collection.delete_one({"id": avatar_id})
-        return result.deleted_count > 0
\ No newline at end of file
+        previous = await self.collection.find_one_and_delete(
+            {"id": avatar_id},
+            projection={"_id": 0, "user_id": 1}
+        )
+        if previous is None:
+            return False
+        await self._invalidate(avatar_id, previous["user_id"])
+        return True
+    
+    async def _invalidate(self, avatar_id: str, user_id: str):
+        """Drop cached reads of an avatar after it changes"""
+        await cache_service.delete(
+            cache_key("avatar", avatar_id),
+            cache_key("avatar_by_user", user_id)
+        )
\ No newline at end of file
@@ -1,72 +1,408 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import Optional, List
+from pymongo import ASCENDING, DESCENDING, InsertOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import Dict, Optional, List, Tuple
 from models.conversation import Conversation, Message
+from repositories.indexes import index_registry
+from services.conversation_cache import conversation_cache
+from services.message_buffer import message_buffer
 from datetime import datetime, timezone
+import asyncio
+import base64
+import json
+
+# Summary fields returned by the conversation listing
+CONVERSATION_LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "user_id": 1,
+    "title": 1,
+    "message_count": 1,
+    "started_at": 1,
+    "last_message_at": 1,
+    "tags": 1
+}
+
+def as_datetime(value):
+    """BSON date as stored, or an ISO string written before scripts.migrate_dates ran"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def encode_cursor(*values) -> str:
+    """Opaque pagination cursor for a sort key"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> list:
+    """Sort key from a cursor produced by encode_cursor; ValueError if malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+index_registry.add_index("conversations", [("id", ASCENDING)], name="id_unique", unique=True)
+# Serves the newest-first listing and its keyset pagination
+index_registry.add_index(
+    "conversations",
+    [("user_id", ASCENDING), ("last_message_at", DESCENDING), ("id", DESCENDING)],
+    name="user_recent"
+)
+index_registry.add_index(
+    "messages",
+    [("conversation_id", ASCENDING), ("seq", ASCENDING)],
+    name="conversation_seq",
+    unique=True
+)
+index_registry.add_query("conversations.find_by_id", "conversations", {"id": "<id>"})
+index_registry.add_query(
+    "conversations.find_by_user",
+    "conversations",
+    {"user_id": "<user_id>", "$or": [
+        {"last_message_at": {"$lt": "<ts>"}},
+        {"last_message_at": "<ts>", "id": {"$lt": "<id>"}}
+    ]},
+    sort=[("last_message_at", DESCENDING), ("id", DESCENDING)],
+    projection=CONVERSATION_LIST_PROJECTION,
+    limit=51
+)
+index_registry.add_query(
+    "messages.get_tail",
+    "messages",
+    {"conversation_id": "<id>"},
+    sort=[("seq", DESCENDING)],
+    limit=20
+)
+index_registry.add_query(
+    "messages.get_messages_slice",
+    "messages",
+    {"conversation_id": "<id>", "seq": {"$gte": 0, "$lt": 40}},
+    sort=[("seq", ASCENDING)]
+)
+index_registry.add_query("messages.delete", "messages", {"conversation_id": "<id>"})
 
 class ConversationRepository:
-    """Repository for Conversation data operations"""
+    """Repository for Conversation data operations
+    
+    Conversation documents hold metadata only; messages live in the messages
+    collection keyed by (conversation_id, seq), where seq is the message's
+    position in the conversation, reserved from message_count.
+    """
     
     def __init__(self, db: AsyncIOMotorDatabase):
         self.db = db
         self.collection = db.conversations
+        self.messages = db.messages
+    
+    def _message_to_doc(self, conversation_id: str, seq: int, message: Message) -> dict:
+        msg_dict = message.model_dump()
+        msg_dict['conversation_id'] = conversation_id
+        msg_dict['seq'] = seq
+        return msg_dict
+    
+    # Documents are written by this repository, so reads build models without re-validating
+    def _doc_to_message(self, msg_dict: dict) -> Message:
+        if 'timestamp' in msg_dict:
+            msg_dict['timestamp'] = as_datetime(msg_dict['timestamp'])
+        return Message.model_construct(**msg_dict)
+    
+    def _doc_to_conversation(self, conv_dict: dict, messages: List[Message]) -> Conversation:
+        conv_dict['messages'] = messages
+        for field in ('started_at', 'last_message_at'):
+            if field in conv_dict:
+                conv_dict[field] = as_datetime(conv_dict[field])
+        return Conversation.model_construct(**conv_dict)
     
     async def create(self, conversation: Conversation) -> Conversation:
         """Create a new conversation"""
-        conv_dict = conversation.model_dump()
-        conv_dict['started_at'] = conv_dict['started_at'].isoformat()
-        conv_dict['last_message_at'] = conv_dict['last_message_at'].isoformat()
-        
-        # Convert message timestamps
-        for msg in conv_dict['messages']:
-            msg['timestamp'] = msg['timestamp'].isoformat()
+        conv_dict = conversation.model_dump(exclude={"messages"})
+        conv_dict['message_count'] = len(conversation.messages)
         
         await self.collection.insert_one(conv_dict)
+        if conversation.messages:
+            await self.messages.insert_many([
+                self._message_to_doc(conversation.id, seq, message)
+                for seq, message in enumerate(conversation.messages)
+            ])
         return conversation
     
-    async def find_by_id(self, conversation_id: str) -> Optional[Conversation]:
-        """Find conversation by ID"""
-        conv_dict = await self.collection.find_one({"id": conversation_id}, {"_id": 0})
-        if conv_dict:
-            conv_dict['started_at'] = datetime.fromisoformat(conv_dict['started_at'])
-            conv_dict['last_message_at'] = datetime.fromisoformat(conv_dict['last_message_at'])
-            
-            for msg in conv_dict['messages']:
-                msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-            
-            return Conversation(**conv_dict)
-        return None
-    
-    async def find_by_user(self, user_id: str, limit: int = 50) -> List[Conversation]:
-        """Find conversations by user ID"""
-        cursor = self.collection.find({"user_id": user_id}, {"_id": 0}).sort("last_message_at", -1).limit(limit)
-        conversations = await cursor.to_list(length=limit)
+    def _with_pending(self, conversation: Conversation, tail: Optional[int]) -> Conversation:
+        """Add messages still in the write-behind buffer (read-your-writes in this worker)"""
+        pending = message_buffer.pending(conversation.id)
+        if not pending:
+            return conversation
+        # In-flight messages may already have a seq counted in message_count, and
+        # be stored in Mongo or the tail cache, while their batch finishes writing
+        stored_ids = {message.id for message in conversation.messages}
+        last_seq = max((message.seq for message in conversation.messages if message.seq is not None), default=-1)
+        unseen = [
+            message for message in pending
+            if message.id not in stored_ids and (message.seq is None or message.seq > last_seq)
+        ]
+        conversation.message_count += sum(
+            1 for message in unseen if message.seq is None or message.seq >= conversation.message_count
+        )
+        conversation.messages = conversation.messages + unseen
+        if tail is not None:
+            conversation.messages = conversation.messages[-tail:] if tail > 0 else []
+        return conversation
+    
+    async def find_by_id(self, conversation_id: str, tail: Optional[int] = None) -> Optional[Conversation]:
+        """Find conversation by ID with its last `tail` messages (all if None)"""
+        conversation = await self._find_stored(conversation_id, tail)
+        if conversation is None:
+            return None
+        return self._with_pending(conversation, tail)
+    
+    async def _find_stored(self, conversation_id: str, tail: Optional[int] = None) -> Optional[Conversation]:
+        """Conversation as written to Mongo, without buffered messages"""
+        conv_dict = await self.collection.find_one(
+            {"id": conversation_id},
+            {"_id": 0, "messages": 0}
+        )
+        if not conv_dict:
+            return None
         
-        result = []
-        for conv_dict in conversations:
-            conv_dict['started_at'] = datetime.fromisoformat(conv_dict['started_at'])
-            conv_dict['last_message_at'] = datetime.fromisoformat(conv_dict['last_message_at'])
-            
-            for msg in conv_dict['messages']:
-                msg['timestamp'] = datetime.fromisoformat(msg['timestamp'])
-            
-            result.append(Conversation(**conv_dict))
+        if tail is None:
+            messages = await self.get_messages_slice(conversation_id, 0, conv_dict.get('message_count', 0))
+        else:
+            messages = await self.get_tail(conversation_id, tail)
+        return self._doc_to_conversation(conv_dict, messages)
+    
+    async def find_recent(self, conversation_id: str, tail: int) -> Optional[Conversation]:
+        """Find conversation by ID with its last `tail` messages, from the Redis tail cache when possible"""
+        conversation = await conversation_cache.get(conversation_id, tail)
+        if conversation is not None:
+            return self._with_pending(conversation, tail)
         
-        return result
+        # Warm with a full cache's worth so later, longer windows also hit
+        conversation = await self._find_stored(conversation_id, tail=max(tail, conversation_cache.capacity))
+        if conversation is None:
+            return None
+        await conversation_cache.warm(conversation)
+        if len(conversation.messages) > tail:
+            conversation.messages = conversation.messages[-tail:] if tail > 0 else []
+        return self._with_pending(conversation, tail)
+    
+    async def find_by_user(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """Find a page of a user's conversations, newest first, without messages
+        
+        Returns the page and the cursor for the next one (None on the last page).
+        Raises ValueError if cursor is malformed.
+        """
+        query = {"user_id": user_id}
+        if cursor:
+            last_message_at, last_id = decode_cursor(cursor)
+            last_message_at = datetime.fromisoformat(str(last_message_at))
+            query["$or"] = [
+                {"last_message_at": {"$lt": last_message_at}},
+                {"last_message_at": last_message_at, "id": {"$lt": last_id}}
+            ]
+        
+        # One extra document tells us whether there is a next page
+        docs = await self.collection.find(query, CONVERSATION_LIST_PROJECTION).sort(
+            [("last_message_at", DESCENDING), ("id", DESCENDING)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        
+        conversations = [self._doc_to_conversation(conv_dict, []) for conv_dict in docs[:limit]]
+        next_cursor = None
+        if len(docs) > limit:
+            last = conversations[-1]
+            next_cursor = encode_cursor(last.last_message_at.isoformat(), last.id)
+        return conversations, next_cursor
     
     async def add_message(self, conversation_id: str, message: Message) -> bool:
         """Add message to conversation"""
-        msg_dict = message.model_dump()
-        msg_dict['timestamp'] = msg_dict['timestamp'].isoformat()
+        return await self.add_messages(conversation_id, [message])
+    
+    async def add_messages(self, conversation_id: str, messages: List[Message]) -> bool:
+        """Append messages, reserving their sequence numbers in one atomic update
         
-        result = await self.collection.update_one(
+        With write-behind enabled the messages are queued and written by
+        write_batch; seq is assigned then.
+        """
+        if not messages:
+            return True
+        if message_buffer.running:
+            message_buffer.add(conversation_id, messages)
+            return True
+        
+        now = datetime.now(timezone.utc)
+        message_count = await self._reserve_seq(conversation_id, messages, now)
+        if message_count is None:
+            return False
+        await self.messages.insert_many(
+            [self._message_to_doc(conversation_id, message.seq, message) for message in messages],
+            ordered=False
+        )
+        await conversation_cache.append(conversation_id, messages, message_count, now)
+        return True
+    
+    async def _reserve_seq(self, conversation_id: str, messages: List[Message], now: datetime) -> Optional[int]:
+        """Assign seq to messages; returns the new message_count, None if the conversation is gone"""
+        conv_dict = await self.collection.find_one_and_update(
             {"id": conversation_id},
             {
-                "$push": {"messages": msg_dict},
-                "$set": {"last_message_at": datetime.now(timezone.utc).isoformat()},
-                "$inc": {"message_count": 1}
-            }
+                "$max": {"last_message_at": now},
+                "$inc": {"message_count": len(messages)}
+            },
+            projection={"_id": 0, "message_count": 1},
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
+        if not conv_dict:
+            return None
+        first_seq = conv_dict['message_count'] - len(messages)
+        for offset, message in enumerate(messages):
+            message.seq = first_seq + offset
+        return conv_dict['message_count']
+    
+    async def write_batch(self, batch: Dict[str, List[Message]]) -> Dict[str, List[Message]]:
+        """Write buffered appends for many conversations; returns the ones to retry
+        
+        Sequence numbers are reserved per conversation (concurrently) and all
+        messages go out in one unordered bulk_write. Messages that already have
+        a seq come from a failed earlier attempt and keep it, so a retry cannot
+        duplicate them.
+        """
+        now = datetime.now(timezone.utc)
+        to_reserve = {
+            conversation_id: [message for message in messages if message.seq is None]
+            for conversation_id, messages in batch.items()
+        }
+        to_reserve = {conversation_id: messages for conversation_id, messages in to_reserve.items() if messages}
+        counts = await asyncio.gather(
+            *(self._reserve_seq(conversation_id, messages, now) for conversation_id, messages in to_reserve.items()),
+            return_exceptions=True
+        )
+        reserved = dict(zip(to_reserve, counts))
+        
+        failed = {}
+        written = {}
+        operations = []
+        for conversation_id, messages in batch.items():
+            count = reserved.get(conversation_id)
+            if isinstance(count, Exception):
+                failed[conversation_id] = messages
+                continue
+            if count is None and conversation_id in reserved:
+                continue  # conversation was deleted
+            written[conversation_id] = messages
+            operations.extend(
+                InsertOne(self._message_to_doc(conversation_id, message.seq, message))
+                for message in messages
+            )
+        
+        if operations:
+            try:
+                await self.messages.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys are messages a previous attempt already wrote
+                if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                    return {**failed, **written}
+        
+        await asyncio.gather(*(
+            conversation_cache.append(conversation_id, messages, reserved[conversation_id], now)
+            if isinstance(reserved.get(conversation_id), int) and len(messages) == len(to_reserve[conversation_id])
+            else conversation_cache.invalidate(conversation_id)
+            for conversation_id, messages in written.items()
+        ))
+        return failed
+    
+    async def get_tail(self, conversation_id: str, limit: int) -> List[Message]:
+        """Get the last `limit` messages in order"""
+        if limit <= 0:
+            return []
+        cursor = self.messages.find(
+            {"conversation_id": conversation_id},
+            {"_id": 0, "conversation_id": 0}
+        ).sort("seq", DESCENDING).limit(limit)
+        docs = await cursor.to_list(length=limit)
+        return [self._doc_to_message(msg) for msg in reversed(docs)]
+    
+    async def get_messages_before(
+        self,
+        conversation_id: str,
+        before: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Message], Optional[str]]:
+        """Get up to `limit` messages older than the `before` cursor (the newest if None), in order
+        
+        Returns the page and the cursor for the previous, older page (None when
+        the start of the conversation is reached). Raises ValueError if
+        before is malformed.
+        """
+        query = {"conversation_id": conversation_id}
+        if before:
+            (before_seq,) = decode_cursor(before)
+            # A tampered cursor may decode to any JSON value; only a seq number is valid
+            if isinstance(before_seq, bool) or not (
+                isinstance(before_seq, int) or (isinstance(before_seq, str) and before_seq.isdigit())
+            ):
+                raise ValueError("Invalid cursor")
+            query["seq"] = {"$lt": int(before_seq)}
+        
+        docs = await self.messages.find(query, {"_id": 0, "conversation_id": 0}).sort(
+            "seq", DESCENDING
+        ).limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]['seq'])
+        return [self._doc_to_message(msg) for msg in reversed(docs)], next_cursor
+    
+    def iter_by_user(self, user_id: str, batch_size: int = 100):
+        """Async iterator over a user's conversation documents (metadata only, as stored)"""
+        return self.collection.find(
+            {"user_id": user_id},
+            CONVERSATION_LIST_PROJECTION
+        ).sort([("last_message_at", DESCENDING), ("id", DESCENDING)]).batch_size(batch_size)
+    
+    def iter_messages(self, conversation_id: str, batch_size: int = 500):
+        """Async iterator over a conversation's message documents in order, as stored"""
+        return self.messages.find(
+            {"conversation_id": conversation_id},
+            {"_id": 0}
+        ).sort("seq", ASCENDING).batch_size(batch_size)
+    
+    async def get_messages_slice(self, conversation_id: str, start: int, end: int) -> List[Message]:
+        """Get messages with seq in [start, end)"""
+        if end <= start:
+            return []
+        cursor = self.messages.find(
+            {"conversation_id": conversation_id, "seq": {"$gte": start, "$lt": end}},
+            {"_id": 0, "conversation_id": 0}
+        ).sort("seq", ASCENDING)
+        docs = await cursor.to_list(length=end - start)
+        return [self._doc_to_message(msg) for msg in docs]
+    
+    async def update_summary(
+        self,
+        conversation_id: str,
+        summary: str,
+        previous_count: int,
+        summarized_count: int
+    ) -> bool:
+        """Advance the rolling summary if no one else has moved it since previous_count"""
+        # Conversations created before summaries existed have no summarized_count
+        expected = {"$in": [0, None]} if previous_count == 0 else previous_count
+        result = await self.collection.update_one(
+            {"id": conversation_id, "summarized_count": expected},
+            {"$set": {"summary": summary, "summarized_count": summarized_count}}
+        )
+        if result.modified_count == 0:
+            return False
+        await conversation_cache.invalidate(conversation_id)
+        return True
     
     async def update(self, conversation_id: str, update_data: dict) -> bool:
         """Update conversation"""
@@ -74,9 +410,13 @@ class ConversationRepository:
             {"id": conversation_id},
             {"$set": update_data}
         )
+        await conversation_cache.invalidate(conversation_id)
         return result.modified_count > 0
     
     async def delete(self, conversation_id: str) -> bool:
-        """Delete conversation"""
+        """Delete conversation and its messages"""
         result = await self.collection.delete_one({"id": conversation_id})
+        message_buffer.discard(conversation_id)
+        await self.messages.delete_many({"conversation_id": conversation_id})
+        await conversation_cache.invalidate(conversation_id)
         return result.deleted_count > 0
\ No newline at end of file
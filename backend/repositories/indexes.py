@@ -0,0 +1,114 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class QueryShape:
+    """A query a repository issues, with sample values, for explain() reports"""
+    
+    def __init__(
+        self,
+        name: str,
+        collection: str,
+        filter: dict,
+        sort: Optional[List[tuple]] = None,
+        projection: Optional[dict] = None,
+        limit: int = 0
+    ):
+        self.name = name
+        self.collection = collection
+        self.filter = filter
+        self.sort = sort
+        self.projection = projection
+        self.limit = limit
+    
+    def command(self) -> dict:
+        """The find command to explain"""
+        command = {"find": self.collection, "filter": self.filter}
+        if self.sort:
+            command["sort"] = dict(self.sort)
+        if self.projection:
+            command["projection"] = self.projection
+        if self.limit:
+            command["limit"] = self.limit
+        return command
+
+class IndexRegistry:
+    """Indexes and query shapes declared by the repositories
+    
+    Each repository module registers what it needs at import time; the server
+    applies the indexes at startup and scripts/explain_queries.py checks that
+    every registered query is served by one of them.
+    """
+    
+    def __init__(self):
+        self.indexes: Dict[str, List[IndexModel]] = {}
+        self.queries: List[QueryShape] = []
+        # Set once apply() has gone through every collection
+        self.applied = False
+    
+    def add_index(self, collection: str, keys: List[tuple], name: str, **options):
+        """Declare an index; options are passed to IndexModel (unique, sparse, ...)"""
+        self.indexes.setdefault(collection, []).append(IndexModel(keys, name=name, **options))
+    
+    def add_query(self, name: str, collection: str, filter: dict, **options):
+        """Declare a query shape for the explain report"""
+        self.queries.append(QueryShape(name, collection, filter, **options))
+    
+    async def apply(self, db: AsyncIOMotorDatabase):
+        """Create every declared index; existing identical indexes are left as is"""
+        for collection, indexes in self.indexes.items():
+            for index in indexes:
+                try:
+                    await db[collection].create_indexes([index])
+                except OperationFailure as e:
+                    # e.g. a unique index over existing duplicates, or a changed
+                    # definition under the same name; the app still starts
+                    logger.error(
+                        "Could not create index %s.%s: %s",
+                        collection, index.document["name"], e
+                    )
+        self.applied = True
+    
+    async def explain(self, db: AsyncIOMotorDatabase) -> List[dict]:
+        """Run explain() on every query shape and report the winning plan's stages"""
+        report = []
+        for query in self.queries:
+            result = await db.command(
+                {"explain": query.command(), "verbosity": "queryPlanner"}
+            )
+            plan = result["queryPlanner"]["winningPlan"]
+            stages = _plan_stages(plan)
+            report.append({
+                "query": query.name,
+                "collection": query.collection,
+                "stages": stages,
+                "indexes": _plan_indexes(plan),
+                "collscan": "COLLSCAN" in stages
+            })
+        return report
+
+def _children(plan: dict) -> List[dict]:
+    children = []
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            children.append(plan[key])
+    children.extend(plan.get("inputStages", []))
+    return children
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for child in _children(plan):
+        stages.extend(_plan_stages(child))
+    return stages
+
+def _plan_indexes(plan: dict) -> List[str]:
+    indexes = [plan["indexName"]] if "indexName" in plan else []
+    for child in _children(plan):
+        indexes.extend(_plan_indexes(child))
+    return indexes
+
+index_registry = IndexRegistry()
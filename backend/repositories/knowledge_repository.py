@@ -1,8 +1,21 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
 from typing import Optional, List
 from models.knowledge import KnowledgeEntry
+from repositories.indexes import index_registry
 from datetime import datetime, timezone
 
+index_registry.add_index("knowledge", [("id", ASCENDING)], name="id_unique", unique=True)
+index_registry.add_index("knowledge", [("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_recent")
+index_registry.add_query("knowledge.find_by_id", "knowledge", {"id": "<id>"})
+index_registry.add_query(
+    "knowledge.find_by_user",
+    "knowledge",
+    {"user_id": "<user_id>"},
+    sort=[("created_at", DESCENDING)],
+    limit=100
+)
+
 class KnowledgeRepository:
     """Repository for Knowledge data operations"""
     
@@ -12,44 +25,43 @@ class KnowledgeRepository:
     
     async def create(self, knowledge: KnowledgeEntry) -> KnowledgeEntry:
         """Create a new knowledge entry"""
-        know_dict = knowledge.model_dump()
-        know_dict['created_at'] = know_dict['created_at'].isoformat()
-        know_dict['updated_at'] = know_dict['updated_at'].isoformat()
-        
-        await self.collection.insert_one(know_dict)
+        await self.collection.insert_one(knowledge.model_dump())
         return knowledge
     
     async def find_by_id(self, knowledge_id: str) -> Optional[KnowledgeEntry]:
         """Find knowledge by ID"""
         know_dict = await self.collection.find_one({"id": knowledge_id}, {"_id": 0})
         if know_dict:
-            know_dict['created_at'] = datetime.fromisoformat(know_dict['created_at'])
-            know_dict['updated_at'] = datetime.fromisoformat(know_dict['updated_at'])
-            return KnowledgeEntry(**know_dict)
+            return KnowledgeEntry.model_construct(**know_dict)
         return None
     
     async def find_by_user(self, user_id: str, limit: int = 100) -> List[KnowledgeEntry]:
         """Find knowledge entries by user ID"""
         cursor = self.collection.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).limit(limit)
         entries = await cursor.to_list(length=limit)
-        
-        result = []
-        for know_dict in entries:
-            know_dict['created_at'] = datetime.fromisoformat(know_dict['created_at'])
-            know_dict['updated_at'] = datetime.fromisoformat(know_dict['updated_at'])
-            result.append(KnowledgeEntry(**know_dict))
-        
-        return result
+        return [KnowledgeEntry.model_construct(**know_dict) for know_dict in entries]
     
     async def update(self, knowledge_id: str, update_data: dict) -> bool:
         """Update knowledge entry"""
-        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        update_data['updated_at'] = datetime.now(timezone.utc)
         result = await self.collection.update_one(
             {"id": knowledge_id},
             {"$set": update_data}
         )
         return result.modified_count > 0
     
+    async def record_page(self, knowledge_id: str, page: int, chunk_count: int) -> bool:
+        """Mark a page as ingested once; False if the entry no longer exists"""
+        await self.collection.update_one(
+            {"id": knowledge_id, "pages_done": {"$ne": page}},
+            {
+                "$push": {"pages_done": page},
+                "$pull": {"failed_pages": page},
+                "$inc": {"chunk_count": chunk_count}
+            }
+        )
+        return await self.collection.count_documents({"id": knowledge_id}, limit=1) > 0
+    
     async def delete(self, knowledge_id: str) -> bool:
         """Delete knowledge entry"""
         result = await self.collection.delete_one({"id": knowledge_id})
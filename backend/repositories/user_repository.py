@@ -1,8 +1,16 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
 from typing import Optional, List
-from models.user import User
+from models.user import User, PersonalityTraits, UserPreferences
+from repositories.indexes import index_registry
+from services.user_cache import user_cache
 from datetime import datetime, timezone
 
+index_registry.add_index("users", [("email", ASCENDING)], name="email_unique", unique=True)
+index_registry.add_index("users", [("id", ASCENDING)], name="id_unique", unique=True)
+index_registry.add_query("users.find_by_email", "users", {"email": "<email>"})
+index_registry.add_query("users.find_by_id", "users", {"id": "<id>"})
+
 class UserRepository:
     """Repository for User data operations (Dependency Inversion)"""
     
@@ -10,43 +18,43 @@ class UserRepository:
         self.db = db
         self.collection = db.users
     
+    def _to_user(self, user_dict: dict) -> User:
+        """Build a User from a stored document without re-validating it"""
+        user_dict['personality'] = PersonalityTraits.model_construct(**(user_dict.get('personality') or {}))
+        user_dict['preferences'] = UserPreferences.model_construct(**(user_dict.get('preferences') or {}))
+        return User.model_construct(**user_dict)
+    
     async def create(self, user: User) -> User:
         """Create a new user"""
-        user_dict = user.model_dump()
-        user_dict['created_at'] = user_dict['created_at'].isoformat()
-        user_dict['updated_at'] = user_dict['updated_at'].isoformat()
-        
-        await self.collection.insert_one(user_dict)
+        await self.collection.insert_one(user.model_dump())
         return user
     
     async def find_by_email(self, email: str) -> Optional[User]:
         """Find user by email"""
         user_dict = await self.collection.find_one({"email": email}, {"_id": 0})
         if user_dict:
-            user_dict['created_at'] = datetime.fromisoformat(user_dict['created_at'])
-            user_dict['updated_at'] = datetime.fromisoformat(user_dict['updated_at'])
-            return User(**user_dict)
+            return self._to_user(user_dict)
         return None
     
     async def find_by_id(self, user_id: str) -> Optional[User]:
         """Find user by ID"""
         user_dict = await self.collection.find_one({"id": user_id}, {"_id": 0})
         if user_dict:
-            user_dict['created_at'] = datetime.fromisoformat(user_dict['created_at'])
-            user_dict['updated_at'] = datetime.fromisoformat(user_dict['updated_at'])
-            return User(**user_dict)
+            return self._to_user(user_dict)
         return None
     
     async def update(self, user_id: str, update_data: dict) -> bool:
         """Update user"""
-        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+        update_data['updated_at'] = datetime.now(timezone.utc)
         result = await self.collection.update_one(
             {"id": user_id},
             {"$set": update_data}
         )
+        await user_cache.invalidate(user_id)
         return result.modified_count > 0
     
     async def delete(self, user_id: str) -> bool:
         """Delete user"""
         result = await self.collection.delete_one({"id": user_id})
+        await user_cache.invalidate(user_id)
         return result.deleted_count > 0
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pymongo.errors import DuplicateKeyError
 from models.user import UserCreate, UserLogin, User, UserResponse
 from services.auth_service import auth_service
+from services.user_cache import user_cache
 from repositories.user_repository import UserRepository
 from server import db
 
@@ -21,7 +23,7 @@ async def register(user_data: UserCreate):
         )
     
     # Hash password
-    hashed_password = auth_service.hash_password(user_data.password)
+    hashed_password = await auth_service.hash_password(user_data.password)
     
     # Create user
     user = User(
@@ -30,7 +32,14 @@ async def register(user_data: UserCreate):
         hashed_password=hashed_password
     )
     
-    await user_repo.create(user)
+    try:
+        await user_repo.create(user)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration (users.email is unique)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     # Create access token
     access_token = auth_service.create_access_token({"sub": user.id})
@@ -61,12 +70,20 @@ async def login(credentials: UserLogin):
         )
     
     # Verify password
-    if not auth_service.verify_password(credentials.password, user.hashed_password):
+    valid, new_hash = await auth_service.verify_and_update_password(
+        credentials.password,
+        user.hashed_password
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    # Transparently upgrade hashes made with deprecated schemes or rounds
+    if new_hash:
+        await user_repo.update(user.id, {"hashed_password": new_hash})
+    
     # Create access token
     access_token = auth_service.create_access_token({"sub": user.id})
     
@@ -96,6 +113,11 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid token"
         )
     
+    user = user_cache.get(user_id)
+    if user:
+        return user
+    
+    generation = user_cache.generation
     user = await user_repo.find_by_id(user_id)
     if not user:
         raise HTTPException(
@@ -103,6 +125,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="User not found"
         )
     
+    user_cache.set(user, generation)
     return user
 
 @router.get("/me", response_model=UserResponse)
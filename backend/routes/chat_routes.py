@@ -1,100 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from models.user import User
-from models.conversation import MessageCreate, Message
+from models.conversation import MessageCreate
 from routes.auth_routes import get_current_user
 from repositories.conversation_repository import ConversationRepository
 from repositories.user_repository import UserRepository
 from services.llm_service import llm_service
-from services.knowledge_service import knowledge_service
 from services.video_service import video_service
-from services.cache_service import cache_service
+from services.chat_pipeline import ChatPipeline
 from server import db
+import json
 import time
 
 router = APIRouter()
 conversation_repo = ConversationRepository(db)
 user_repo = UserRepository(db)
+chat_pipeline = ChatPipeline(conversation_repo)
+
+class CachedTokenStream:
+    """Token stream that replays a cached reply as a single token"""
+    
+    def __init__(self, text: str):
+        self.text = text
+    
+    async def __aiter__(self):
+        yield self.text
+    
+    async def aclose(self):
+        pass
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @router.post("/send")
 async def send_message(
     conversation_id: str,
     message_data: MessageCreate,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     """Send a message and get response"""
-    start_time = time.time()
-    
-    # Get conversation
-    conversation = await conversation_repo.find_by_id(conversation_id)
-    if not conversation or conversation.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
+    turn = await chat_pipeline.prepare(conversation_id, message_data.content, current_user)
     
-    # Create user message
-    user_message = Message(
-        role="user",
-        content=message_data.content
-    )
-    await conversation_repo.add_message(conversation_id, user_message)
+    # Generate LLM response
+    response_text = await chat_pipeline.generate(turn)
     
-    # Search knowledge base for relevant context
-    knowledge_results = await knowledge_service.search_knowledge(
-        current_user.id,
-        message_data.content,
-        top_k=3
-    )
+    # Persist both messages and queue video generation
+    assistant_message, video_job = await chat_pipeline.finalize(turn, response_text)
     
-    rag_context = "\n".join([r["content"] for r in knowledge_results]) if knowledge_results else ""
+    response.headers["Server-Timing"] = turn.timer.server_timing()
     
-    # Generate personality prompt
-    user_data = {
-        "name": current_user.name,
-        "personality": current_user.personality.model_dump()
+    return {
+        "message": assistant_message,
+        "video_job_id": video_job["job_id"] if video_job else None,
+        "knowledge_used": len(turn.knowledge_results) > 0,
+        "cached": turn.cache_hit
     }
-    personality_prompt = llm_service.generate_personality_prompt(user_data)
-    
-    if rag_context:
-        personality_prompt += f"\n\nRelevant context from your knowledge base:\n{rag_context}"
-    
-    # Get recent messages for context
-    recent_messages = conversation.messages[-10:] if len(conversation.messages) > 0 else []
-    message_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in recent_messages
-    ]
-    message_history.append({"role": "user", "content": message_data.content})
+
+@router.post("/stream")
+async def stream_message(
+    conversation_id: str,
+    message_data: MessageCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Send a message and stream the response as Server-Sent Events"""
+    turn = await chat_pipeline.prepare(conversation_id, message_data.content, current_user)
     
-    # Generate LLM response
-    response_text = await llm_service.generate_response(
-        message_history,
-        personality_prompt
-    )
+    cached = await chat_pipeline.cached_response(turn)
+    if cached is not None:
+        token_stream = CachedTokenStream(cached)
+    else:
+        # Open the upstream stream before responding so overload surfaces as a 503
+        token_stream = await turn.timer.run(
+            "llm_open",
+            llm_service.open_stream(turn.message_history, turn.personality_prompt)
+        )
+    server_timing = turn.timer.server_timing()
     
-    # Generate video (background job)
-    video_job = None
-    if current_user.avatar_id:
-        video_job = await video_service.generate_video(
-            current_user.avatar_id,
-            response_text,
-            emotion="neutral"
+    async def event_stream():
+        chunks = []
+        time_to_first_token_ms = None
+        
+        try:
+            async for token in token_stream:
+                if time_to_first_token_ms is None:
+                    time_to_first_token_ms = int((time.time() - turn.start_time) * 1000)
+                chunks.append(token)
+                yield _sse_event("token", {"content": token})
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        
+        # Persist both messages and queue video generation
+        assistant_message, video_job = await chat_pipeline.finalize(
+            turn,
+            "".join(chunks),
+            time_to_first_token_ms=time_to_first_token_ms
         )
+        
+        yield _sse_event("done", {
+            "message": assistant_message.model_dump(mode="json"),
+            "video_job_id": video_job["job_id"] if video_job else None,
+            "knowledge_used": len(turn.knowledge_results) > 0,
+            "cached": turn.cache_hit,
+            "timings": turn.timer.timings
+        })
     
-    # Create assistant message
-    response_time_ms = int((time.time() - start_time) * 1000)
-    assistant_message = Message(
-        role="assistant",
-        content=response_text,
-        response_time_ms=response_time_ms
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Server-Timing": server_timing
+        },
+        # Releases the LLM slot even if the client disconnects before streaming starts
+        background=BackgroundTask(token_stream.aclose)
     )
-    await conversation_repo.add_message(conversation_id, assistant_message)
-    
-    return {
-        "message": assistant_message,
-        "video_job_id": video_job["job_id"] if video_job else None,
-        "knowledge_used": len(knowledge_results) > 0
-    }
 
 @router.get("/video-status/{job_id}")
 async def get_video_status(
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from models.user import User
-from models.conversation import Conversation, ConversationCreate, ConversationResponse, Message
+from models.conversation import Conversation, ConversationCreate, ConversationResponse, Message, MessagePage
 from routes.auth_routes import get_current_user
 from repositories.conversation_repository import ConversationRepository
 from server import db
-from typing import List
+from typing import List, Optional
+import orjson
+import zlib
 
 router = APIRouter()
 conversation_repo = ConversationRepository(db)
 
+# Uncompressed NDJSON collected before each gzip write
+EXPORT_CHUNK_BYTES = 64 * 1024
+
 @router.post("/", response_model=ConversationResponse)
 async def create_conversation(
     conv_data: ConversationCreate,
@@ -34,11 +40,24 @@ async def create_conversation(
 
 @router.get("/", response_model=List[ConversationResponse])
 async def get_conversations(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    limit: int = 50
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
-    """Get user's conversations"""
-    conversations = await conversation_repo.find_by_user(current_user.id, limit)
+    """Get user's conversations, newest first
+
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    try:
+        conversations, next_cursor = await conversation_repo.find_by_user(current_user.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         ConversationResponse(
@@ -53,6 +72,76 @@ async def get_conversations(
         for conv in conversations
     ]
 
+@router.get("/export")
+async def export_conversations(
+    gzip: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream all of the user's conversations as NDJSON, optionally gzip-compressed
+
+    Each conversation is written as a {"type": "conversation", ...} line followed
+    by one {"type": "message", ...} line per message, read from Mongo in batches.
+    """
+    async def lines():
+        async for conversation in conversation_repo.iter_by_user(current_user.id):
+            yield orjson.dumps({"type": "conversation", **conversation}) + b"\n"
+            async for message in conversation_repo.iter_messages(conversation["id"]):
+                yield orjson.dumps({"type": "message", **message}) + b"\n"
+    
+    async def compressed():
+        # wbits=31 writes a gzip header and trailer
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        buffer = []
+        size = 0
+        async for line in lines():
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_BYTES:
+                chunk = compressor.compress(b"".join(buffer))
+                buffer, size = [], 0
+                if chunk:
+                    yield chunk
+        yield compressor.compress(b"".join(buffer)) + compressor.flush()
+    
+    filename = "conversations.ndjson.gz" if gzip else "conversations.ndjson"
+    return StreamingResponse(
+        compressed() if gzip else lines(),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
+async def get_messages(
+    conversation_id: str,
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a page of messages, newest first by page and in order within it
+
+    Pass next_cursor back as `before` to load older messages.
+    """
+    conversation = await conversation_repo.find_by_id(conversation_id, tail=0)
+    
+    if not conversation or conversation.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    try:
+        messages, next_cursor = await conversation_repo.get_messages_before(conversation_id, before, limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Messages come from our own documents; skip response validation and encode directly
+    return ORJSONResponse(
+        MessagePage.model_construct(messages=messages, next_cursor=next_cursor).model_dump()
+    )
+
 @router.get("/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
@@ -67,7 +156,7 @@ async def get_conversation(
             detail="Conversation not found"
         )
     
-    return conversation
+    return ORJSONResponse(conversation.model_dump())
 
 @router.delete("/{conversation_id}")
 async def delete_conversation(
@@ -75,7 +164,7 @@ async def delete_conversation(
     current_user: User = Depends(get_current_user)
 ):
     """Delete a conversation"""
-    conversation = await conversation_repo.find_by_id(conversation_id)
+    conversation = await conversation_repo.find_by_id(conversation_id, tail=0)
     
     if not conversation or conversation.user_id != current_user.id:
         raise HTTPException(
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from models.user import User
-from models.knowledge import KnowledgeEntry, KnowledgeCreate, KnowledgeResponse
+from models.knowledge import (
+    KnowledgeEntry, KnowledgeCreate, KnowledgeResponse,
+    KnowledgeUploadResponse, KnowledgeStatusResponse
+)
 from routes.auth_routes import get_current_user
 from repositories.knowledge_repository import KnowledgeRepository
 from services.knowledge_service import knowledge_service
+from services.ingestion_service import ingestion_service
+from services.response_cache import response_cache
 from server import db
 from typing import List
-import PyPDF2
+import asyncio
 import os
+import shutil
 from pathlib import Path
 
 router = APIRouter()
@@ -16,6 +22,11 @@ knowledge_repo = KnowledgeRepository(db)
 UPLOAD_DIR = Path(os.environ.get('UPLOAD_DIR', '/app/backend/uploads'))
 UPLOAD_DIR.mkdir(exist_ok=True, parents=True)
 
+def _save_upload(file: UploadFile, file_path: Path):
+    """Copy the spooled upload to disk without reading it all into memory"""
+    with open(file_path, 'wb') as f:
+        shutil.copyfileobj(file.file, f)
+
 @router.post("/", response_model=KnowledgeResponse)
 async def create_knowledge(
     knowledge_data: KnowledgeCreate,
@@ -31,14 +42,16 @@ async def create_knowledge(
     )
     
     # Add to vector database
-    embedding_id = await knowledge_service.add_knowledge(
+    knowledge.chunk_count = await knowledge_service.add_knowledge(
         current_user.id,
+        knowledge.id,
         knowledge_data.content,
         {"title": knowledge_data.title, "source": knowledge_data.source}
     )
     
-    knowledge.embedding_id = embedding_id
+    knowledge.embedding_id = knowledge.id
     await knowledge_repo.create(knowledge)
+    response_cache.invalidate_user(current_user.id)
     
     return KnowledgeResponse(
         id=knowledge.id,
@@ -46,59 +59,83 @@ async def create_knowledge(
         source=knowledge.source,
         title=knowledge.title,
         tags=knowledge.tags,
-        created_at=knowledge.created_at
+        created_at=knowledge.created_at,
+        status=knowledge.status
     )
 
-@router.post("/upload")
+@router.post("/upload", response_model=KnowledgeUploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload and process document"""
-    # Read file content
-    content = await file.read()
-    
-    # Extract text based on file type
-    if file.filename.endswith('.pdf'):
-        import io
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    elif file.filename.endswith('.txt'):
-        text = content.decode('utf-8')
-    else:
+    """Upload a document; it is chunked and embedded by a background job"""
+    suffix = Path(file.filename or "").suffix.lower()
+    if suffix not in (".pdf", ".txt"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Unsupported file type"
         )
     
-    # Create knowledge entry
     knowledge = KnowledgeEntry(
         user_id=current_user.id,
         source="upload",
         title=file.filename,
-        content=text,
+        content="",
+        status="pending",
         tags=[]
     )
+    knowledge.embedding_id = knowledge.id
     
-    # Add to vector database
-    embedding_id = await knowledge_service.add_knowledge(
-        current_user.id,
-        text,
-        {"title": file.filename, "source": "upload"}
-    )
+    # Save the file for the worker
+    file_path = UPLOAD_DIR / f"knowledge_{knowledge.id}{suffix}"
+    await asyncio.to_thread(_save_upload, file, file_path)
+    knowledge.file_path = str(file_path)
     
-    knowledge.embedding_id = embedding_id
     await knowledge_repo.create(knowledge)
+    try:
+        job = await ingestion_service.ingest_document(knowledge_repo, knowledge.id, current_user.id, str(file_path))
+    except Exception:
+        # Nothing will ever process the entry; don't leave it pending
+        await knowledge_repo.delete(knowledge.id)
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not queue document ingestion"
+        )
     
-    return KnowledgeResponse(
+    return KnowledgeUploadResponse(
         id=knowledge.id,
         user_id=knowledge.user_id,
         source=knowledge.source,
         title=knowledge.title,
         tags=knowledge.tags,
-        created_at=knowledge.created_at
+        created_at=knowledge.created_at,
+        status=knowledge.status,
+        job_id=job["job_id"]
+    )
+
+@router.get("/{knowledge_id}/status", response_model=KnowledgeStatusResponse)
+async def get_knowledge_status(
+    knowledge_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get ingestion progress of an uploaded document"""
+    knowledge = await knowledge_repo.find_by_id(knowledge_id)
+    
+    if not knowledge or knowledge.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Knowledge not found"
+        )
+    
+    return KnowledgeStatusResponse(
+        id=knowledge.id,
+        status=knowledge.status,
+        pages_total=knowledge.pages_total,
+        pages_processed=len(knowledge.pages_done),
+        chunk_count=knowledge.chunk_count,
+        failed_pages=knowledge.failed_pages,
+        error=knowledge.error
     )
 
 @router.get("/", response_model=List[KnowledgeResponse])
@@ -116,7 +153,8 @@ async def get_knowledge(
             source=entry.source,
             title=entry.title,
             tags=entry.tags,
-            created_at=entry.created_at
+            created_at=entry.created_at,
+            status=entry.status
         )
         for entry in entries
     ]
@@ -136,10 +174,12 @@ async def delete_knowledge(
         )
     
     # Delete from vector database
-    if knowledge.embedding_id:
-        await knowledge_service.delete_knowledge(current_user.id, knowledge.embedding_id)
+    await knowledge_service.delete_knowledge(current_user.id, knowledge.id, knowledge.embedding_id)
     
     # Delete from MongoDB
     await knowledge_repo.delete(knowledge_id)
+    if knowledge.file_path:
+        Path(knowledge.file_path).unlink(missing_ok=True)
+    response_cache.invalidate_user(current_user.id)
     
     return {"message": "Knowledge deleted successfully"}
\ No newline at end of file
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from models.user import User, UserResponse
+from models.user import User, UserResponse, UserProfileUpdate
 from routes.auth_routes import get_current_user
 from repositories.user_repository import UserRepository
+from services.response_cache import response_cache
 from server import db
-from typing import Dict
 
 router = APIRouter()
 user_repo = UserRepository(db)
@@ -23,13 +23,14 @@ async def get_profile(current_user: User = Depends(get_current_user)):
 
 @router.put("/profile", response_model=UserResponse)
 async def update_profile(
-    update_data: Dict,
+    update_data: UserProfileUpdate,
     current_user: User = Depends(get_current_user)
 ):
     """Update user profile"""
-    # Filter allowed fields
-    allowed_fields = ['name', 'personality', 'preferences', 'onboarding_completed']
-    filtered_data = {k: v for k, v in update_data.items() if k in allowed_fields}
+    # Users are read back without validation, so only validated values are stored
+    filtered_data = {
+        k: v for k, v in update_data.model_dump(exclude_unset=True).items() if v is not None
+    }
     
     if not filtered_data:
         raise HTTPException(
@@ -39,6 +40,7 @@ async def update_profile(
     
     # Update user
     await user_repo.update(current_user.id, filtered_data)
+    response_cache.invalidate_user(current_user.id)
     
     # Fetch updated user
     updated_user = await user_repo.find_by_id(current_user.id)
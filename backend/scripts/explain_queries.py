@@ -0,0 +1,49 @@
+"""
+Explain every query shape the repositories register and flag collection scans.
+
+    python -m scripts.explain_queries [--apply-indexes]
+
+Exits with status 1 if any query's winning plan contains a COLLSCAN, so it can
+gate a deploy. --apply-indexes creates the registered indexes first.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from repositories.indexes import index_registry
+# Importing the repositories registers their indexes and queries
+import repositories.avatar_repository
+import repositories.conversation_repository
+import repositories.knowledge_repository
+import repositories.user_repository
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+async def main(apply_indexes: bool) -> int:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    if apply_indexes:
+        await index_registry.apply(db)
+    
+    report = await index_registry.explain(db)
+    client.close()
+    
+    for row in report:
+        flag = "COLLSCAN" if row["collscan"] else "ok"
+        indexes = ",".join(row["indexes"]) or "-"
+        print(f"{flag:8s} {row['query']:34s} index={indexes:20s} plan={'>'.join(row['stages'])}")
+    
+    scans = sum(1 for row in report if row["collscan"])
+    print(f"{len(report)} queries, {scans} collection scans")
+    return 1 if scans else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--apply-indexes', action='store_true')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.apply_indexes)))
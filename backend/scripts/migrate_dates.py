@@ -0,0 +1,64 @@
+"""
+Convert ISO-8601 date strings written by older versions into native BSON dates.
+
+    python -m scripts.migrate_dates [--batch-size 1000] [--dry-run]
+
+Run after scripts.migrate_messages. Only string values are touched, so the
+script is safe to re-run.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+DATE_FIELDS = {
+    "users": ["created_at", "updated_at"],
+    "avatars": ["created_at", "updated_at"],
+    "knowledge": ["created_at", "updated_at"],
+    "conversations": ["started_at", "last_message_at"],
+    "messages": ["timestamp"],
+}
+
+async def migrate_collection(db, name: str, fields: list, batch_size: int, dry_run: bool) -> int:
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    converted = 0
+    operations = []
+    async for doc in db[name].find(query, projection).batch_size(batch_size):
+        update = {
+            field: datetime.fromisoformat(doc[field])
+            for field in fields
+            if isinstance(doc.get(field), str)
+        }
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        converted += 1
+        if len(operations) >= batch_size:
+            if not dry_run:
+                await db[name].bulk_write(operations, ordered=False)
+            operations = []
+    if operations and not dry_run:
+        await db[name].bulk_write(operations, ordered=False)
+    return converted
+
+async def main(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    for name, fields in DATE_FIELDS.items():
+        converted = await migrate_collection(db, name, fields, batch_size, dry_run)
+        action = "would convert" if dry_run else "converted"
+        print(f"{name}: {action} {converted} documents")
+    client.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
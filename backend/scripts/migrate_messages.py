@@ -0,0 +1,74 @@
+"""
+Move messages embedded in conversation documents into the messages collection.
+
+    python -m scripts.migrate_messages [--batch-size 500] [--dry-run]
+
+Each embedded message becomes {conversation_id, seq, ...} with seq equal to its
+array index, then the array is removed from the conversation. Messages are
+upserted on (conversation_id, seq), so the script is safe to re-run and to run
+while the new code is already serving writes (those continue from message_count).
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from repositories.indexes import index_registry
+import repositories.conversation_repository  # registers the messages indexes
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+async def migrate_conversation(db, conversation: dict, batch_size: int, dry_run: bool) -> int:
+    conversation_id = conversation['id']
+    messages = conversation.get('messages') or []
+    if dry_run:
+        return len(messages)
+    
+    for start in range(0, len(messages), batch_size):
+        operations = []
+        for seq, msg in enumerate(messages[start:start + batch_size], start=start):
+            doc = {**msg, "conversation_id": conversation_id, "seq": seq}
+            operations.append(UpdateOne(
+                {"conversation_id": conversation_id, "seq": seq},
+                {"$setOnInsert": doc},
+                upsert=True
+            ))
+        await db.messages.bulk_write(operations, ordered=False)
+    
+    await db.conversations.update_one(
+        {"id": conversation_id},
+        {"$unset": {"messages": ""}, "$max": {"message_count": len(messages)}}
+    )
+    return len(messages)
+
+async def main(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    await index_registry.apply(db)
+    
+    conversations = 0
+    messages = 0
+    cursor = db.conversations.find(
+        {"messages": {"$exists": True}},
+        {"_id": 0, "id": 1, "messages": 1}
+    ).batch_size(50)
+    async for conversation in cursor:
+        messages += await migrate_conversation(db, conversation, batch_size, dry_run)
+        conversations += 1
+        if conversations % 100 == 0:
+            print(f"conversations={conversations} messages={messages}")
+    
+    action = "would move" if dry_run else "moved"
+    print(f"done: {action} {messages} messages from {conversations} conversations")
+    client.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
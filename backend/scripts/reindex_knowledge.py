@@ -0,0 +1,183 @@
+"""
+Rebuild the vector store from the knowledge entries in MongoDB.
+
+    python -m scripts.reindex_knowledge [--batch-size 200] [--workers 2] [--user USER_ID] [--restart] [--api-stopped]
+
+Entries are read in id order, chunked, embedded in parallel batches and written
+per user with one delete + upsert, replacing whatever vectors an entry had.
+After every batch the last processed id is saved to --checkpoint, so an
+interrupted run continues where it stopped; --restart ignores the checkpoint.
+Entries still being ingested by an upload job are skipped; the job indexes them.
+Vectors are written in the configured KNOWLEDGE_COLLECTION_LAYOUT, so this is
+also how an existing store moves to another layout.
+
+Without CHROMA_HOST the script writes to CHROMA_PERSIST_DIR, which only one
+process may open; it refuses to run unless --api-stopped confirms the API
+(and anything else using that directory) is not running.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from services.knowledge_service import knowledge_service  # noqa: E402
+
+def load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"last_id": None, "entries": 0, "chunks": 0}
+
+def save_checkpoint(path: Path, checkpoint: dict):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint))
+    tmp.replace(path)
+
+def embed_parallel(texts: List[str], pool: ThreadPoolExecutor, batch_size: int) -> np.ndarray:
+    """Embed texts in batches spread over the pool, keeping their order"""
+    futures = [
+        pool.submit(knowledge_service.embedder.encode, texts[start:start + batch_size], batch_size)
+        for start in range(0, len(texts), batch_size)
+    ]
+    return np.concatenate([future.result() for future in futures])
+
+def index_batch(entries: List[dict], pool: ThreadPoolExecutor) -> Dict[str, int]:
+    """Replace the vectors of entries; returns the chunk count per entry id (blocking)"""
+    chunks = {entry["id"]: knowledge_service.chunker.split(entry["content"]) for entry in entries}
+    texts = [chunk for entry in entries for chunk in chunks[entry["id"]]]
+    embeddings = embed_parallel(texts, pool, knowledge_service.embed_batch_size) if texts else []
+    
+    by_user: Dict[str, List[dict]] = {}
+    for entry in entries:
+        by_user.setdefault(entry["user_id"], []).append(entry)
+    
+    offsets = {}
+    offset = 0
+    for entry in entries:
+        offsets[entry["id"]] = offset
+        offset += len(chunks[entry["id"]])
+    
+    for user_id, user_entries in by_user.items():
+        collection = knowledge_service.get_or_create_collection(user_id)
+        collection.delete(where=knowledge_service.layout.where(
+            user_id, knowledge_id={"$in": [entry["id"] for entry in user_entries]}
+        ))
+        ids, documents, metadatas, vectors = [], [], [], []
+        for entry in user_entries:
+            metadata = {
+                "title": entry["title"],
+                "source": entry["source"],
+                "user_id": user_id,
+                "knowledge_id": entry["id"]
+            }
+            start = offsets[entry["id"]]
+            for i, chunk in enumerate(chunks[entry["id"]]):
+                ids.append(f"{entry['id']}:{i}")
+                documents.append(chunk)
+                metadatas.append({**metadata, "chunk": i})
+                vectors.append(embeddings[start + i].tolist())
+        for start in range(0, len(ids), knowledge_service.add_batch_size):
+            end = start + knowledge_service.add_batch_size
+            collection.upsert(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                embeddings=vectors[start:end]
+            )
+    
+    return {entry_id: len(entry_chunks) for entry_id, entry_chunks in chunks.items()}
+
+async def main(batch_size: int, workers: int, checkpoint_path: Path, restart: bool, user_id: str):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    if restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    checkpoint = load_checkpoint(checkpoint_path)
+    
+    # Uploads still in progress have no content yet and are indexed by their job
+    query = {"content": {"$gt": ""}, "status": {"$nin": ["pending", "processing"]}}
+    if user_id:
+        query["user_id"] = user_id
+    total = await db.knowledge.count_documents(query)
+    if checkpoint["last_id"]:
+        query["id"] = {"$gt": checkpoint["last_id"]}
+        print(f"resuming after {checkpoint['last_id']} ({checkpoint['entries']}/{total} done)")
+    
+    knowledge_service.load()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reindex")
+    cursor = db.knowledge.find(
+        query,
+        {"_id": 0, "id": 1, "user_id": 1, "title": 1, "source": 1, "content": 1}
+    ).sort("id", 1).batch_size(batch_size)
+    
+    start = time.perf_counter()
+    processed = 0
+    
+    async def flush(entries: List[dict]):
+        nonlocal processed
+        counts = await asyncio.to_thread(index_batch, entries, pool)
+        await db.knowledge.bulk_write([
+            UpdateOne({"id": entry_id}, {"$set": {"chunk_count": count, "embedding_id": entry_id}})
+            for entry_id, count in counts.items()
+        ], ordered=False)
+        
+        processed += len(entries)
+        checkpoint["last_id"] = entries[-1]["id"]
+        checkpoint["entries"] += len(entries)
+        checkpoint["chunks"] += sum(counts.values())
+        save_checkpoint(checkpoint_path, checkpoint)
+        
+        rate = processed / (time.perf_counter() - start)
+        remaining = max(total - checkpoint["entries"], 0)
+        print(
+            f"entries={checkpoint['entries']}/{total} chunks={checkpoint['chunks']} "
+            f"rate={rate:.1f}/s eta={remaining / rate if rate else 0:.0f}s"
+        )
+    
+    batch = []
+    async for entry in cursor:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    
+    pool.shutdown()
+    print(
+        f"done: {checkpoint['entries']} entries, {checkpoint['chunks']} chunks "
+        f"in {time.perf_counter() - start:.0f}s"
+    )
+    checkpoint_path.unlink(missing_ok=True)
+    client.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=200, help="entries per batch")
+    parser.add_argument('--workers', type=int, default=2, help="parallel embedding threads")
+    parser.add_argument('--checkpoint', type=Path, default=Path('.reindex_checkpoint.json'))
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint")
+    parser.add_argument('--user', help="only reindex this user's entries")
+    parser.add_argument(
+        '--api-stopped', action='store_true',
+        help="confirm the API is stopped, to write a local store (CHROMA_HOST unset)"
+    )
+    args = parser.parse_args()
+    if not knowledge_service.shared_store and not args.api_stopped:
+        sys.exit(
+            "CHROMA_HOST is not set, so this would open the API's local store at "
+            f"{knowledge_service.persist_directory}. Stop the API and pass --api-stopped, "
+            "or point CHROMA_HOST at the Chroma server the API uses."
+        )
+    asyncio.run(main(args.batch_size, args.workers, args.checkpoint, args.restart, args.user))
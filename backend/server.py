@@ -1,34 +1,28 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
+import secrets
 from pathlib import Path
-from redis import Redis
-from rq import Queue
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Dates are stored as BSON dates and read back as UTC-aware datetimes
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
-# Redis connection for caching and job queue
-redis_client = Redis(
-    host=os.environ.get('REDIS_HOST', 'localhost'),
-    port=int(os.environ.get('REDIS_PORT', 6379)),
-    db=0,
-    decode_responses=True
-)
-
-# RQ Queue for background jobs
-job_queue = Queue('digital_self', connection=redis_client)
+# Redis connection pools shared by every service
+from services.redis_pool import redis_pool
 
 # Create the main app
-app = FastAPI(title="Digital Self Platform API")
+app = FastAPI(title="Digital Self Platform API", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Import and register route modules
@@ -38,6 +32,19 @@ from routes.avatar_routes import router as avatar_router
 from routes.conversation_routes import router as conversation_router
 from routes.knowledge_routes import router as knowledge_router
 from routes.chat_routes import router as chat_router
+from services.llm_service import llm_service, LLMOverloadedError
+from services.response_cache import response_cache
+from services.user_cache import user_cache
+from services.auth_service import auth_service, PasswordHashOverloadedError
+from services.rate_limiter import rate_limiter
+from services.cache_service import cache_service
+from services.conversation_cache import conversation_cache
+from services.message_buffer import message_buffer
+from services.knowledge_service import knowledge_service
+from services.ingestion_service import ingestion_service
+from repositories.conversation_repository import ConversationRepository
+from repositories.indexes import index_registry
+from middleware.rate_limit import RateLimitMiddleware
 
 api_router.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(user_router, prefix="/users", tags=["Users"])
@@ -56,7 +63,7 @@ async def health_check():
         # Check MongoDB
         await db.command("ping")
         # Check Redis
-        redis_client.ping()
+        await redis_pool.client.ping()
         return {
             "status": "healthy",
             "mongodb": "connected",
@@ -68,14 +75,90 @@ async def health_check():
             "error": str(e)
         }
 
+@api_router.get("/health/live")
+async def liveness():
+    """The process is up and serving; no dependency checks"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Ready for traffic: MongoDB and Redis reachable, indexes created and the embedding model warm"""
+    checks = {
+        "mongodb": False,
+        "redis": False,
+        "indexes": index_registry.applied,
+        "embedding_model": knowledge_service.ready
+    }
+    try:
+        await db.command("ping")
+        checks["mongodb"] = True
+        await redis_pool.client.ping()
+        checks["redis"] = True
+    except Exception as e:
+        checks["error"] = str(e)
+    ready = all(checks[name] for name in ("mongodb", "redis", "indexes", "embedding_model"))
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **checks}
+    )
+
+# Internal counters are not for the public: with METRICS_TOKEN set, callers must
+# send it as a bearer token; without it, only local clients may read them
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+LOCAL_CLIENTS = {"127.0.0.1", "::1", "localhost"}
+
+def require_metrics_access(request: Request):
+    if METRICS_TOKEN:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token, METRICS_TOKEN):
+            return
+    elif request.client is not None and request.client.host in LOCAL_CLIENTS:
+        return
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+
+@api_router.get("/metrics", dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    return {
+        "llm": llm_service.get_stats(),
+        "response_cache": response_cache.get_stats(),
+        "user_cache": user_cache.get_stats(),
+        "password_hashing": auth_service.get_stats(),
+        "rate_limiter": rate_limiter.get_stats(),
+        "redis_pool": redis_pool.get_stats(),
+        "cache": cache_service.get_stats(),
+        "conversation_cache": conversation_cache.get_stats(),
+        "message_buffer": message_buffer.get_stats(),
+        "embeddings": knowledge_service.get_stats()
+    }
+
 app.include_router(api_router)
 
+@app.exception_handler(LLMOverloadedError)
+@app.exception_handler(PasswordHashOverloadedError)
+async def overloaded_handler(request: Request, exc: Exception):
+    # Shed load cleanly instead of queueing without bound
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+# Added before CORS so that 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Policy"
+    ],
 )
 
 logging.basicConfig(
@@ -84,7 +167,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Model load and index creation run in the background; readiness reports when both are done
+background_tasks = []
+
+async def apply_indexes():
+    """Create the declared indexes, retrying while MongoDB is unreachable"""
+    while True:
+        try:
+            await index_registry.apply(db)
+            return
+        except Exception as e:
+            logger.warning("Index creation failed, retrying: %s", e)
+            await asyncio.sleep(5)
+
+@app.on_event("startup")
+async def startup():
+    background_tasks.append(asyncio.create_task(knowledge_service.warm_up()))
+    background_tasks.append(asyncio.create_task(apply_indexes()))
+    await redis_pool.connect()
+    await user_cache.start()
+    await message_buffer.start(ConversationRepository(db).write_batch)
+
 @app.on_event("shutdown")
 async def shutdown():
+    for task in background_tasks:
+        if not task.done():
+            task.cancel()
+    await ingestion_service.stop()
+    # Buffered messages must reach Mongo before the client closes
+    await message_buffer.stop()
     client.close()
-    redis_client.close()
\ No newline at end of file
+    await llm_service.close()
+    await knowledge_service.close()
+    await user_cache.stop()
+    auth_service.close()
+    await redis_pool.close()
\ No newline at end of file
@@ -2,10 +2,17 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import asyncio
 import os
+import time
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+class PasswordHashOverloadedError(Exception):
+    """Raised when too many password hashing jobs are already queued"""
+
 class AuthService:
     """Service for authentication operations (Single Responsibility)"""
     
@@ -15,14 +22,72 @@ class AuthService:
         self.access_token_expire_minutes = int(
             os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', 30)
         )
+        
+        # bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+        self.hash_workers = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+        self.hash_max_queue = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 32))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.hash_workers,
+            thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._total_ms = 0.0
+    
+    async def _run_hashing(self, func, *args):
+        """Run a bcrypt operation on the hashing executor"""
+        if self._pending >= self.hash_workers + self.hash_max_queue:
+            self._rejected += 1
+            raise PasswordHashOverloadedError("Too many concurrent password operations")
+        
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+            self._total_ms += (time.perf_counter() - start) * 1000
     
-    def hash_password(self, password: str) -> str:
+    async def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
-        return pwd_context.hash(password)
+        return await self._run_hashing(pwd_context.hash, password)
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return await self._run_hashing(pwd_context.verify, plain_password, hashed_password)
+    
+    async def verify_and_update_password(
+        self,
+        plain_password: str,
+        hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a new hash if the stored one needs upgrading"""
+        valid, new_hash = await self._run_hashing(
+            pwd_context.verify_and_update, plain_password, hashed_password
+        )
+        if new_hash:
+            self._rehashed += 1
+        return valid, new_hash
+    
+    def get_stats(self) -> dict:
+        """Get password hashing executor counters"""
+        return {
+            "workers": self.hash_workers,
+            "max_queue": self.hash_max_queue,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "rehashed": self._rehashed,
+            "avg_ms": self._total_ms / self._completed if self._completed else 0.0
+        }
+    
+    def close(self):
+        """Shut down the hashing executor"""
+        self._executor.shutdown(wait=False)
     
     def create_access_token(self, data: dict) -> str:
         """Create a JWT access token"""
@@ -1,60 +1,387 @@
-from redis import Redis
-import json
+from collections import OrderedDict
+from pydantic import BaseModel
+from redis.asyncio import Redis
+from services.redis_pool import redis_pool
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Tuple, Type
+import asyncio
+import functools
+import hashlib
+import inspect
+import logging
+import math
+import orjson
 import os
-from typing import Optional, Any
+import random
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value for the cache (orjson; pydantic models are dumped as JSON)"""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def loads(payload: bytes) -> Any:
+    return orjson.loads(payload)
+
+def cache_key(namespace: str, *args: Any) -> str:
+    """Key under which @cached stores the result for these arguments"""
+    key = ":".join(str(arg) for arg in args)
+    if len(key) > 128:
+        key = hashlib.sha256(key.encode()).hexdigest()
+    return f"cache:{namespace}:{key}"
+
+class LocalCache:
+    """In-process LRU of serialized entries bounded by total payload bytes"""
+    
+    def __init__(self, max_bytes: int, max_entry_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+    
+    def set(self, key: str, payload: bytes, ttl: float):
+        self.delete(key)
+        size = len(key) + len(payload)
+        ttl = min(ttl, self.ttl)
+        if size > self.max_entry_bytes or ttl <= 0:
+            return
+        while self._entries and self._bytes + size > self.max_bytes:
+            old_key, (old_payload, _) = self._entries.popitem(last=False)
+            self._bytes -= len(old_key) + len(old_payload)
+            self.evictions += 1
+        self._entries[key] = (payload, time.monotonic() + ttl)
+        self._bytes += size
+    
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(key) + len(entry[0])
+    
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
 
 class CacheService:
-    """Service for Redis cache operations (Single Responsibility)"""
-    
-    def __init__(self):
-        self.redis = Redis(
-            host=os.environ.get('REDIS_HOST', 'localhost'),
-            port=int(os.environ.get('REDIS_PORT', 6379)),
-            db=0,
-            decode_responses=True
-        )
+    """Two-tier cache: an in-process LRU (L1) in front of Redis (L2)
+    
+    Values are stored as an orjson envelope {"v": value, "d": recompute seconds,
+    "x": expiry timestamp} so readers can refresh hot keys early (XFetch).
+    L1 entries live at most CACHE_L1_TTL seconds, which bounds how long other
+    workers can serve a value after it is deleted.
+    """
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        self.redis = redis or redis_pool.client
         self.default_ttl = 3600  # 1 hour
+        self.local = LocalCache(
+            max_bytes=int(os.environ.get('CACHE_L1_MAX_BYTES', 32 * 1024 * 1024)),
+            max_entry_bytes=int(os.environ.get('CACHE_L1_MAX_ENTRY_BYTES', 256 * 1024)),
+            ttl=float(os.environ.get('CACHE_L1_TTL', 5))
+        )
+        # XFetch beta; larger refreshes earlier, 0 disables early refresh
+        self.early_refresh_beta = float(os.environ.get('CACHE_EARLY_REFRESH_BETA', 1.0))
+        self.lock_ttl = float(os.environ.get('CACHE_LOCK_TTL', 10))
+        self.lock_wait = float(os.environ.get('CACHE_LOCK_WAIT', 2))
+        # How long get_or_set remembers a None result; 0 disables negative caching
+        self.negative_ttl = int(os.environ.get('CACHE_NEGATIVE_TTL', 30))
+        self._release_lock = self.redis.register_script(RELEASE_LOCK_LUA)
+        
+        # Loads in flight in this process, so concurrent misses share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshes = set()
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "coalesced": 0,
+            "lock_waits": 0,
+            "early_refreshes": 0,
+            "errors": 0
+        }
     
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+    def _envelope(self, value: Any, ttl: int, delta: float) -> bytes:
+        return dumps({"v": value, "d": round(delta, 4), "x": time.time() + ttl})
+    
+    async def _read(self, key: str) -> Optional[dict]:
+        """Get the envelope for key from L1, falling back to Redis"""
+        payload = self.local.get(key)
+        if payload is not None:
+            self._stats["l1_hits"] += 1
+            return loads(payload)
         try:
-            value = self.redis.get(key)
-            if value:
-                return json.loads(value)
-            return None
+            payload = await self.redis.get(key)
         except Exception as e:
-            print(f"Cache get error: {e}")
+            self._stats["errors"] += 1
+            logger.warning("Cache get error: %s", e)
+            return None
+        if payload is None:
+            self._stats["misses"] += 1
             return None
+        self._stats["l2_hits"] += 1
+        envelope = loads(payload)
+        self.local.set(key, payload, envelope["x"] - time.time())
+        return envelope
     
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in cache with optional TTL"""
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache"""
+        envelope = await self._read(key)
+        return envelope["v"] if envelope is not None else None
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, delta: float = 0.0) -> bool:
+        """Set value in cache with optional TTL; delta is how long the value took to compute"""
+        ttl = ttl or self.default_ttl
+        payload = self._envelope(value, ttl, delta)
+        self.local.set(key, payload, ttl)
+        try:
+            await self.redis.set(key, payload, ex=ttl)
+            return True
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("Cache set error: %s", e)
+            return False
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Get several values in one round-trip; missing keys are omitted"""
+        found = {}
+        remote = []
+        for key in keys:
+            payload = self.local.get(key)
+            if payload is None:
+                remote.append(key)
+            else:
+                self._stats["l1_hits"] += 1
+                found[key] = loads(payload)["v"]
+        if not remote:
+            return found
         try:
-            ttl = ttl or self.default_ttl
-            self.redis.setex(key, ttl, json.dumps(value))
+            payloads = await self.redis.mget(remote)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("Cache get_many error: %s", e)
+            return found
+        now = time.time()
+        for key, payload in zip(remote, payloads):
+            if payload is None:
+                self._stats["misses"] += 1
+                continue
+            self._stats["l2_hits"] += 1
+            envelope = loads(payload)
+            self.local.set(key, payload, envelope["x"] - now)
+            found[key] = envelope["v"]
+        return found
+    
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """Set several values with the same TTL in one pipelined round-trip"""
+        if not items:
+            return True
+        ttl = ttl or self.default_ttl
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    payload = self._envelope(value, ttl, 0.0)
+                    self.local.set(key, payload, ttl)
+                    pipe.set(key, payload, ex=ttl)
+                await pipe.execute()
             return True
         except Exception as e:
-            print(f"Cache set error: {e}")
+            self._stats["errors"] += 1
+            logger.warning("Cache set_many error: %s", e)
             return False
     
-    def delete(self, key: str) -> bool:
-        """Delete key from cache"""
+    async def delete(self, *keys: str) -> bool:
+        """Delete keys from both tiers"""
+        if not keys:
+            return True
+        for key in keys:
+            self.local.delete(key)
         try:
-            self.redis.delete(key)
+            await self.redis.delete(*keys)
             return True
         except Exception as e:
-            print(f"Cache delete error: {e}")
+            self._stats["errors"] += 1
+            logger.warning("Cache delete error: %s", e)
             return False
     
-    def exists(self, key: str) -> bool:
+    async def exists(self, key: str) -> bool:
         """Check if key exists in cache"""
-        return self.redis.exists(key) > 0
+        return await self.redis.exists(key) > 0
     
-    def increment(self, key: str, amount: int = 1) -> int:
+    async def increment(self, key: str, amount: int = 1) -> int:
         """Increment a counter in cache"""
-        return self.redis.incr(key, amount)
+        return await self.redis.incr(key, amount)
     
-    def expire(self, key: str, ttl: int) -> bool:
+    async def expire(self, key: str, ttl: int) -> bool:
         """Set expiration on a key"""
-        return self.redis.expire(key, ttl)
+        return await self.redis.expire(key, ttl)
+    
+    def _should_refresh_early(self, envelope: dict) -> bool:
+        """XFetch: refresh before expiry with a probability that grows as expiry nears"""
+        if self.early_refresh_beta <= 0 or not envelope.get("d"):
+            return False
+        jitter = -envelope["d"] * self.early_refresh_beta * math.log(1.0 - random.random())
+        return time.time() + jitter >= envelope["x"]
+    
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None) -> Any:
+        """Get key, calling loader at most once per process (and per cluster while
+        the lock is held) when it is missing. None results are cached for
+        negative_ttl seconds, so lookups of absent records skip the loader too."""
+        ttl = ttl or self.default_ttl
+        envelope = await self._read(key)
+        if envelope is not None:
+            if self._should_refresh_early(envelope) and key not in self._inflight:
+                self._stats["early_refreshes"] += 1
+                task = asyncio.create_task(self._load(key, loader, ttl))
+                self._refreshes.add(task)
+                task.add_done_callback(self._refreshes.discard)
+            return envelope["v"]
+        return await self._load(key, loader, ttl)
+    
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+        """Single-flight load: concurrent callers in this process await the same future"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(future)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._load_locked(key, loader, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+    
+    async def _load_locked(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+        """Take a short Redis lock so only one worker recomputes; others wait for its value"""
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            # SET NX returns None when another worker holds the lock
+            locked = bool(await self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)))
+            contended = not locked
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.warning("Cache lock error: %s", e)
+            locked = contended = False
+        
+        if contended:
+            envelope = await self._wait_for_value(key)
+            if envelope is not None:
+                return envelope["v"]
+        
+        try:
+            self._stats["loads"] += 1
+            start = time.perf_counter()
+            value = await loader()
+            if value is not None:
+                await self.set(key, value, ttl, delta=time.perf_counter() - start)
+            elif self.negative_ttl > 0:
+                await self.set(key, None, min(ttl, self.negative_ttl))
+            return value
+        finally:
+            if locked:
+                try:
+                    await self._release_lock(keys=[lock_key], args=[token])
+                except Exception as e:
+                    logger.warning("Cache unlock error: %s", e)
+    
+    async def _wait_for_value(self, key: str) -> Optional[dict]:
+        """Poll Redis while another worker holds the lock for the envelope it stores;
+        None if it does not finish in time"""
+        self._stats["lock_waits"] += 1
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+            try:
+                payload = await self.redis.get(key)
+            except Exception:
+                return None
+            if payload is not None:
+                envelope = loads(payload)
+                self.local.set(key, payload, envelope["x"] - time.time())
+                return envelope
+        return None
+    
+    def get_stats(self) -> dict:
+        """Get hit/miss counters and L1 usage"""
+        return {
+            **self._stats,
+            "l1_entries": len(self.local),
+            "l1_bytes": self.local.size_bytes,
+            "l1_max_bytes": self.local.max_bytes,
+            "l1_evictions": self.local.evictions,
+            "inflight": len(self._inflight)
+        }
+
+cache_service = CacheService()
 
-cache_service = CacheService()
\ No newline at end of file
+def cached(namespace: str, ttl: Optional[int] = None, model: Optional[Type[BaseModel]] = None):
+    """Cache an async method's result under cache_key(namespace, *args)
+    
+    Arguments are bound to the method's signature first, with defaults filled
+    in, so f(x) and f(arg=x) share the key cache_key(namespace, x). The first
+    positional argument (self) is not part of the key. If model is given,
+    cached dicts (or lists of dicts) are validated back into it.
+    Callers are responsible for deleting the key when the data changes.
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = cache_key(namespace, *list(bound.arguments.values())[1:])
+            value = await cache_service.get_or_set(key, lambda: func(self, *args, **kwargs), ttl)
+            if model is None or value is None or isinstance(value, model):
+                return value
+            if isinstance(value, list):
+                return [item if isinstance(item, model) else model.model_validate(item) for item in value]
+            return model.model_validate(value)
+        return wrapper
+    return decorator
@@ -0,0 +1,224 @@
+from fastapi import HTTPException, status
+from models.user import User
+from models.conversation import Conversation, Message
+from repositories.conversation_repository import ConversationRepository
+from services.llm_service import llm_service
+from services.knowledge_service import knowledge_service
+from services.video_service import video_service
+from services.response_cache import response_cache
+from services.context_builder import context_builder
+from services.summary_service import ConversationSummarizer
+from typing import List, Dict, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class StageTimer:
+    """Collects wall-clock timings for the stages of one chat turn"""
+    
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+    
+    async def run(self, name: str, awaitable):
+        """Await a stage and record how long it took"""
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000
+    
+    def record(self, name: str, start: float):
+        """Record a synchronous stage that began at start (perf_counter)"""
+        self.timings[name] = (time.perf_counter() - start) * 1000
+    
+    def server_timing(self) -> str:
+        """Format timings as a Server-Timing header value"""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.timings.items())
+
+class ChatTurn:
+    """State carried between the stages of one chat turn"""
+    
+    def __init__(self, user: User, content: str):
+        self.start_time = time.time()
+        self.user = user
+        self.content = content
+        self.timer = StageTimer()
+        self.user_message = Message(role="user", content=content)
+        self.conversation: Optional[Conversation] = None
+        self.query_embedding = None
+        self.knowledge_results: List[Dict] = []
+        self.rag_context = ""
+        self.base_prompt = ""
+        self.personality_prompt = ""
+        self.context_tokens = 0
+        self.cache_probe = None
+        self.cache_hit = False
+        self.message_history: List[Dict[str, str]] = []
+
+class ChatPipeline:
+    """Runs a chat turn as explicit stages, overlapping the independent ones"""
+    
+    def __init__(self, conversation_repo: ConversationRepository):
+        self.conversation_repo = conversation_repo
+        self.summarizer = ConversationSummarizer(conversation_repo)
+    
+    async def _load_conversation(self, conversation_id: str, user: User) -> Conversation:
+        """Stage: load the conversation with the tail of messages the context can use"""
+        conversation = await self.conversation_repo.find_recent(
+            conversation_id,
+            tail=user.preferences.context_window
+        )
+        if not conversation or conversation.user_id != user.id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conversation not found"
+            )
+        return conversation
+    
+    def _build_base_prompt(self, turn: ChatTurn) -> str:
+        """Stage: personality prompt"""
+        user_data = {
+            "name": turn.user.name,
+            "personality": turn.user.personality.model_dump()
+        }
+        return llm_service.generate_personality_prompt(user_data)
+    
+    def _build_context(self, turn: ChatTurn):
+        """Stage: fit prompt, knowledge, summary and history into the token budget"""
+        conversation = turn.conversation
+        window = context_builder.build(
+            turn.base_prompt,
+            [r["content"] for r in turn.knowledge_results],
+            conversation.summary,
+            conversation.messages,
+            first_index=conversation.message_count - len(conversation.messages),
+            summarized_count=conversation.summarized_count,
+            user_content=turn.content,
+            max_messages=turn.user.preferences.context_window
+        )
+        turn.personality_prompt = window.system_prompt
+        turn.message_history = window.message_history
+        turn.context_tokens = window.tokens
+        return window
+    
+    async def _search_knowledge(self, turn: ChatTurn) -> List[Dict]:
+        """Stage: embed the question once, then search the user's knowledge with it"""
+        turn.query_embedding = await knowledge_service.embed_query(turn.content)
+        return await knowledge_service.search_knowledge(
+            turn.user.id,
+            turn.content,
+            top_k=3,
+            query_embedding=turn.query_embedding
+        )
+    
+    async def prepare(self, conversation_id: str, content: str, user: User) -> ChatTurn:
+        """Run every stage that precedes the LLM call"""
+        turn = ChatTurn(user, content)
+        
+        # Knowledge retrieval does not depend on the conversation, so it runs
+        # while the conversation loads
+        knowledge_task = asyncio.create_task(turn.timer.run("knowledge", self._search_knowledge(turn)))
+        try:
+            turn.conversation = await turn.timer.run(
+                "conversation",
+                self._load_conversation(conversation_id, user)
+            )
+        except BaseException:
+            knowledge_task.cancel()
+            raise
+        
+        start = time.perf_counter()
+        turn.base_prompt = self._build_base_prompt(turn)
+        turn.timer.record("prompt", start)
+        
+        turn.knowledge_results = await knowledge_task
+        turn.rag_context = "\n".join([r["content"] for r in turn.knowledge_results]) if turn.knowledge_results else ""
+        
+        start = time.perf_counter()
+        window = self._build_context(turn)
+        turn.timer.record("context", start)
+        
+        # Turns that fell out of the window are summarized in the background
+        self.summarizer.maybe_schedule(
+            turn.conversation.id,
+            turn.conversation.summary,
+            turn.conversation.summarized_count,
+            window.window_start
+        )
+        
+        return turn
+    
+    async def cached_response(self, turn: ChatTurn) -> Optional[str]:
+        """Stage: look the question up in the response cache"""
+        turn.cache_probe = response_cache.probe(
+            turn.user.id,
+            turn.content,
+            turn.base_prompt,
+            turn.rag_context,
+            history=turn.message_history[:-1],
+            summary=turn.conversation.summary,
+            embedding=turn.query_embedding
+        )
+        cached = await turn.timer.run("cache", response_cache.get(turn.cache_probe))
+        turn.cache_hit = cached is not None
+        return cached
+    
+    async def generate(self, turn: ChatTurn) -> str:
+        """Stage: LLM completion, skipped on a cache hit"""
+        cached = await self.cached_response(turn)
+        if cached is not None:
+            return cached
+        
+        return await turn.timer.run(
+            "llm",
+            llm_service.generate_response(turn.message_history, turn.personality_prompt)
+        )
+    
+    async def _enqueue_video(self, turn: ChatTurn, response_text: str) -> Optional[dict]:
+        """Stage: queue avatar video generation when the user has an avatar"""
+        if not turn.user.avatar_id:
+            return None
+        return await video_service.generate_video(
+            turn.user.avatar_id,
+            response_text,
+            emotion="neutral"
+        )
+    
+    async def finalize(
+        self,
+        turn: ChatTurn,
+        response_text: str,
+        time_to_first_token_ms: Optional[int] = None
+    ):
+        """Persist both messages in one write and queue the video job"""
+        if turn.cache_probe is not None and not turn.cache_hit:
+            response_cache.set(turn.cache_probe, response_text)
+        
+        assistant_message = Message(
+            role="assistant",
+            content=response_text,
+            response_time_ms=int((time.time() - turn.start_time) * 1000),
+            time_to_first_token_ms=time_to_first_token_ms
+        )
+        
+        _, video_job = await asyncio.gather(
+            turn.timer.run(
+                "persist",
+                self.conversation_repo.add_messages(
+                    turn.conversation.id,
+                    [turn.user_message, assistant_message]
+                )
+            ),
+            turn.timer.run("video", self._enqueue_video(turn, response_text))
+        )
+        
+        logger.info(
+            "chat turn conversation=%s context_tokens=%d %s",
+            turn.conversation.id,
+            turn.context_tokens,
+            " ".join(f"{name}={ms:.1f}ms" for name, ms in turn.timer.timings.items())
+        )
+        
+        return assistant_message, video_job
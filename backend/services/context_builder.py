@@ -0,0 +1,104 @@
+from typing import List, Dict, Optional
+import os
+
+# Llama tokenizers average roughly four characters per token on English text;
+# a cheap estimate keeps prompt sizing off the hot path's CPU budget
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+class ContextWindow:
+    """Result of fitting prompt, knowledge and history into the token budget"""
+    
+    def __init__(
+        self,
+        system_prompt: str,
+        message_history: List[Dict[str, str]],
+        window_start: int,
+        rag_chunks_used: int,
+        tokens: int
+    ):
+        self.system_prompt = system_prompt
+        self.message_history = message_history
+        # Absolute index of the oldest message kept verbatim in the history
+        self.window_start = window_start
+        self.rag_chunks_used = rag_chunks_used
+        self.tokens = tokens
+
+class ContextBuilder:
+    """Assembles the LLM context within a fixed token budget"""
+    
+    def __init__(self):
+        self.token_budget = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 3000))
+        self.rag_share = float(os.environ.get('CONTEXT_RAG_TOKEN_SHARE', 0.4))
+    
+    def _fit_rag(self, rag_chunks: List[str], budget: int) -> List[str]:
+        """Keep the highest ranked chunks that fit, truncating the first if needed"""
+        kept = []
+        used = 0
+        for chunk in rag_chunks:
+            tokens = estimate_tokens(chunk)
+            if used + tokens > budget:
+                if not kept and budget > 0:
+                    kept.append(chunk[:budget * CHARS_PER_TOKEN])
+                break
+            kept.append(chunk)
+            used += tokens
+        return kept
+    
+    def build(
+        self,
+        personality_prompt: str,
+        rag_chunks: List[str],
+        summary: Optional[str],
+        messages: list,
+        first_index: int,
+        summarized_count: int,
+        user_content: str,
+        max_messages: int
+    ) -> ContextWindow:
+        """
+        Fit the context into the budget. Priority: personality prompt and the
+        new user message, then knowledge (capped at rag_share of the budget),
+        then the rolling summary, then history from newest to oldest.
+        messages is a tail of the conversation starting at absolute index first_index.
+        """
+        used = estimate_tokens(personality_prompt) + estimate_tokens(user_content) + MESSAGE_OVERHEAD_TOKENS * 2
+        
+        system_prompt = personality_prompt
+        kept_chunks = self._fit_rag(
+            rag_chunks,
+            min(int(self.token_budget * self.rag_share), self.token_budget - used)
+        )
+        if kept_chunks:
+            rag_context = "\n".join(kept_chunks)
+            system_prompt += f"\n\nRelevant context from your knowledge base:\n{rag_context}"
+            used += estimate_tokens(rag_context)
+        
+        if summary:
+            summary_tokens = estimate_tokens(summary)
+            if used + summary_tokens <= self.token_budget:
+                system_prompt += f"\n\nSummary of the earlier conversation:\n{summary}"
+                used += summary_tokens
+        
+        # Messages already folded into the summary are never repeated verbatim
+        start = max(summarized_count - first_index, 0, len(messages) - max_messages)
+        history = []
+        for msg in reversed(messages[start:]):
+            tokens = estimate_tokens(msg.content) + MESSAGE_OVERHEAD_TOKENS
+            if used + tokens > self.token_budget:
+                break
+            history.append({"role": msg.role, "content": msg.content})
+            used += tokens
+        history.reverse()
+        history.append({"role": "user", "content": user_content})
+        
+        window_start = first_index + len(messages) - (len(history) - 1)
+        return ContextWindow(system_prompt, history, window_start, len(kept_chunks), used)
+
+context_builder = ContextBuilder()
@@ -0,0 +1,211 @@
+from redis.asyncio import Redis
+from models.conversation import Conversation, Message
+from services.redis_pool import redis_pool
+from datetime import datetime
+from typing import List, Optional
+import logging
+import orjson
+import os
+
+logger = logging.getLogger(__name__)
+
+# KEYS: meta, tail, dirty. ARGV: ttl, capacity, dirty_ttl, first_seq, message_count,
+# last_message_at, messages... Appends only if the cached tail ends right before
+# first_seq; anything else means the cache is behind and it is dropped.
+APPEND_LUA = """
+local ttl = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local first = tonumber(ARGV[4])
+local new_count = tonumber(ARGV[5])
+local cached = tonumber(redis.call('HGET', KEYS[1], 'message_count'))
+if cached == nil then
+    redis.call('SET', KEYS[3], 1, 'EX', ARGV[3])
+    return 0
+end
+if cached >= new_count then
+    return 1
+end
+if cached ~= first then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('SET', KEYS[3], 1, 'EX', ARGV[3])
+    return -1
+end
+redis.call('RPUSH', KEYS[2], unpack(ARGV, 7))
+redis.call('LTRIM', KEYS[2], -capacity, -1)
+redis.call('HSET', KEYS[1], 'message_count', new_count, 'last_message_at', ARGV[6])
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+return 1
+"""
+
+# KEYS: meta, tail, dirty. ARGV: ttl, message_count, field count, fields..., messages...
+# Refuses to replace a newer cached tail, or to warm while a write is unaccounted for.
+WARM_LUA = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+local cached = tonumber(redis.call('HGET', KEYS[1], 'message_count'))
+if cached ~= nil and cached > tonumber(ARGV[2]) then
+    return 0
+end
+local ttl = tonumber(ARGV[1])
+local fields = tonumber(ARGV[3])
+redis.call('DEL', KEYS[1], KEYS[2])
+redis.call('HSET', KEYS[1], unpack(ARGV, 4, 3 + fields))
+if #ARGV > 3 + fields then
+    redis.call('RPUSH', KEYS[2], unpack(ARGV, 4 + fields))
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+class ConversationTailCache:
+    """Write-through Redis cache of each active conversation's recent messages
+    
+    Per conversation, a hash holds the owner and counters and a capped list
+    holds the last `capacity` messages. Both expire after `ttl` seconds
+    without a write. Writers append after the Mongo write; readers warm the
+    cache from Mongo on a miss.
+    """
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        self.enabled = os.environ.get('CONVERSATION_CACHE_ENABLED', 'true').lower() == 'true'
+        self.capacity = int(os.environ.get('CONVERSATION_CACHE_MESSAGES', 50))
+        self.ttl = int(os.environ.get('CONVERSATION_CACHE_TTL', 1800))
+        # How long readers must not warm after a write the cache could not apply
+        self.dirty_ttl = 10
+        self.redis = redis or redis_pool.client
+        self._append = self.redis.register_script(APPEND_LUA)
+        self._warm = self.redis.register_script(WARM_LUA)
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+    
+    def _keys(self, conversation_id: str) -> List[str]:
+        prefix = f"conv:{conversation_id}"
+        return [f"{prefix}:meta", f"{prefix}:tail", f"{prefix}:dirty"]
+    
+    def _dump_message(self, message: Message) -> bytes:
+        return orjson.dumps(message.model_dump())
+    
+    def _load_message(self, payload: bytes) -> Message:
+        msg_dict = orjson.loads(payload)
+        msg_dict['timestamp'] = datetime.fromisoformat(msg_dict['timestamp'])
+        return Message.model_construct(**msg_dict)
+    
+    async def get(self, conversation_id: str, limit: int) -> Optional[Conversation]:
+        """Conversation metadata with its last `limit` messages, or None on a miss"""
+        if not self.enabled or limit > self.capacity:
+            return None
+        meta_key, tail_key, _ = self._keys(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hgetall(meta_key)
+                if limit > 0:
+                    pipe.lrange(tail_key, -limit, -1)
+                results = await pipe.execute()
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Conversation cache get error: %s", e)
+            return None
+        
+        meta = results[0]
+        if not meta:
+            self._misses += 1
+            return None
+        meta = {key.decode(): value.decode() for key, value in meta.items()}
+        message_count = int(meta['message_count'])
+        messages = [self._load_message(payload) for payload in results[1]] if limit > 0 else []
+        # The list may hold fewer messages than asked for only if the conversation does
+        if len(messages) < min(limit, message_count):
+            self._misses += 1
+            return None
+        
+        self._hits += 1
+        return Conversation.model_construct(
+            id=conversation_id,
+            user_id=meta['user_id'],
+            title=meta['title'],
+            messages=messages,
+            started_at=datetime.fromisoformat(meta['started_at']),
+            last_message_at=datetime.fromisoformat(meta['last_message_at']),
+            message_count=message_count,
+            summary=meta.get('summary'),
+            summarized_count=int(meta['summarized_count']),
+            tags=[]
+        )
+    
+    async def warm(self, conversation: Conversation):
+        """Cache a conversation read from Mongo with its most recent messages"""
+        if not self.enabled:
+            return
+        try:
+            # A cache that cannot be warmed must never fail the read it serves
+            fields = {
+                "user_id": conversation.user_id,
+                "title": conversation.title,
+                "message_count": conversation.message_count,
+                "summarized_count": conversation.summarized_count or 0,
+                "started_at": conversation.started_at.isoformat(),
+                "last_message_at": conversation.last_message_at.isoformat()
+            }
+            if conversation.summary:
+                fields["summary"] = conversation.summary
+            flat = [item for pair in fields.items() for item in pair]
+            messages = [self._dump_message(msg) for msg in conversation.messages[-self.capacity:]]
+            await self._warm(
+                keys=self._keys(conversation.id),
+                args=[self.ttl, conversation.message_count, len(flat), *flat, *messages]
+            )
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Conversation cache warm error: %s", e)
+    
+    async def append(self, conversation_id: str, messages: List[Message], message_count: int, last_message_at: datetime):
+        """Append stored messages (with seq assigned) to the cached tail, if cached"""
+        if not self.enabled or not messages:
+            return
+        try:
+            await self._append(
+                keys=self._keys(conversation_id),
+                args=[
+                    self.ttl,
+                    self.capacity,
+                    self.dirty_ttl,
+                    messages[0].seq,
+                    message_count,
+                    last_message_at.isoformat(),
+                    *(self._dump_message(msg) for msg in messages)
+                ]
+            )
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Conversation cache append error: %s", e)
+            await self.invalidate(conversation_id)
+    
+    async def invalidate(self, conversation_id: str):
+        """Drop a conversation and keep readers from re-warming it with older data"""
+        if not self.enabled:
+            return
+        meta_key, tail_key, dirty_key = self._keys(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(meta_key, tail_key)
+                pipe.set(dirty_key, 1, ex=self.dirty_ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Conversation cache invalidate error: %s", e)
+    
+    def get_stats(self) -> dict:
+        """Get hit/miss counters"""
+        return {
+            "enabled": self.enabled,
+            "hits": self._hits,
+            "misses": self._misses,
+            "errors": self._errors,
+            "capacity": self.capacity
+        }
+
+conversation_cache = ConversationTailCache()
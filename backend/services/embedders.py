@@ -0,0 +1,164 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List
+import json
+import os
+import threading
+import numpy as np
+
+class Embedder(ABC):
+    """Text embedding model used by KnowledgeService
+    
+    Construction is cheap; the model is loaded on first use or by load().
+    `name` identifies the model and backend, so cached vectors are never
+    shared between backends that produce different numbers.
+    """
+    
+    name: str
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+    
+    @property
+    @abstractmethod
+    def tokenizer(self):
+        """Hugging Face tokenizer matching the model (used for chunking)"""
+    
+    @property
+    @abstractmethod
+    def max_seq_length(self) -> int:
+        """Longest input in tokens; longer texts are truncated"""
+    
+    @abstractmethod
+    def load(self):
+        """Load the model now instead of on first use"""
+    
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """L2-normalized float32 embeddings, one row per text"""
+
+class SentenceTransformerEmbedder(Embedder):
+    """PyTorch sentence-transformers backend"""
+    
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.name = model_name
+        self._model = None
+    
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+    
+    @property
+    def tokenizer(self):
+        return self.load().tokenizer
+    
+    @property
+    def max_seq_length(self) -> int:
+        return self.load().max_seq_length
+    
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.load().encode(texts, batch_size=batch_size)
+
+class OnnxEmbedder(Embedder):
+    """ONNX Runtime CPU backend, by default with the model's int8-quantized export
+    
+    Runs the transformer exported to ONNX and applies the same mean pooling and
+    L2 normalization as the sentence-transformers pipeline of all-MiniLM-L6-v2,
+    without importing torch. `file_name` is a local path or a file in the
+    model's Hugging Face repository (which ships quantized exports under onnx/).
+    """
+    
+    def __init__(self, model_name: str, file_name: str, threads: int = 0):
+        super().__init__(model_name)
+        self.repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        self.file_name = file_name
+        self.threads = threads
+        self.name = f"{model_name}:onnx:{Path(file_name).stem}"
+        self._session = None
+        self._tokenizer = None
+        self._inputs: List[str] = []
+        self._max_seq_length = 0
+    
+    def load(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._load()
+        return self._session
+    
+    def _load(self):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from transformers import AutoTokenizer
+        
+        if os.path.isfile(self.file_name):
+            model_path = self.file_name
+        else:
+            model_path = hf_hub_download(self.repo_id, self.file_name)
+        with open(hf_hub_download(self.repo_id, "sentence_bert_config.json")) as f:
+            self._max_seq_length = json.load(f)["max_seq_length"]
+        self._tokenizer = AutoTokenizer.from_pretrained(self.repo_id)
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = [node.name for node in session.get_inputs()]
+        self._session = session
+    
+    @property
+    def tokenizer(self):
+        self.load()
+        return self._tokenizer
+    
+    @property
+    def max_seq_length(self) -> int:
+        self.load()
+        return self._max_seq_length
+    
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        session = self.load()
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encoding = self._tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self._max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {}
+            for name in self._inputs:
+                if name in encoding:
+                    feeds[name] = encoding[name].astype(np.int64)
+                else:
+                    feeds[name] = np.zeros_like(encoding["input_ids"], dtype=np.int64)
+            hidden = session.run(None, feeds)[0]
+            
+            # Mean over real tokens, then unit length
+            mask = encoding["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.concatenate(batches)
+
+def create_embedder(model_name: str) -> Embedder:
+    """Embedder for EMBEDDING_BACKEND: "torch" (default) or "onnx" """
+    backend = os.environ.get('EMBEDDING_BACKEND', 'torch').lower()
+    if backend == 'onnx':
+        return OnnxEmbedder(
+            model_name,
+            os.environ.get('EMBEDDING_ONNX_FILE', 'onnx/model_quint8_avx2.onnx'),
+            int(os.environ.get('EMBEDDING_ONNX_THREADS', 0))
+        )
+    if backend != 'torch':
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    return SentenceTransformerEmbedder(model_name)
@@ -0,0 +1,109 @@
+from redis.asyncio import Redis
+from services.cache_service import LocalCache
+from services.redis_pool import redis_pool
+from typing import List, Optional
+import hashlib
+import logging
+import numpy as np
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace
+    
+    The embedding model is uncased and ignores whitespace runs, so texts that
+    normalize to the same string have the same embedding.
+    """
+    return _WHITESPACE.sub(" ", text.lower()).strip()
+
+class EmbeddingCache:
+    """Two-tier cache of text embeddings: an in-process LRU in front of Redis
+    
+    Vectors are stored as raw float16 bytes (768 bytes for a 384-dim model)
+    under emb:<model>:<sha256 of the normalized text>, so switching models
+    never serves stale vectors.
+    """
+    
+    def __init__(self, model_name: str, redis: Optional[Redis] = None):
+        self.enabled = os.environ.get('EMBED_CACHE_ENABLED', 'true').lower() == 'true'
+        self.model_name = model_name
+        self.ttl = int(os.environ.get('EMBED_CACHE_TTL', 7 * 24 * 3600))
+        self.local = LocalCache(
+            max_bytes=int(os.environ.get('EMBED_CACHE_L1_MAX_BYTES', 16 * 1024 * 1024)),
+            max_entry_bytes=64 * 1024,
+            ttl=self.ttl
+        )
+        self.redis = redis or redis_pool.client
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+        self._errors = 0
+    
+    def key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"emb:{self.model_name}:{digest}"
+    
+    async def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached embedding for each text, or None where there is none"""
+        if not self.enabled:
+            return [None] * len(texts)
+        keys = [self.key(text) for text in texts]
+        payloads = [self.local.get(key) for key in keys]
+        self._l1_hits += sum(payload is not None for payload in payloads)
+        
+        missing = [i for i, payload in enumerate(payloads) if payload is None]
+        if missing:
+            try:
+                found = await self.redis.mget([keys[i] for i in missing])
+            except Exception as e:
+                self._errors += 1
+                logger.warning("Embedding cache get error: %s", e)
+                found = [None] * len(missing)
+            for i, payload in zip(missing, found):
+                if payload is not None:
+                    self._l2_hits += 1
+                    self.local.set(keys[i], payload, self.ttl)
+                    payloads[i] = payload
+                else:
+                    self._misses += 1
+        
+        return [
+            np.frombuffer(payload, dtype=np.float16).astype(np.float32) if payload is not None else None
+            for payload in payloads
+        ]
+    
+    async def set_many(self, texts: List[str], embeddings: np.ndarray):
+        """Store freshly computed embeddings in both tiers"""
+        if not self.enabled or not texts:
+            return
+        keys = [self.key(text) for text in texts]
+        payloads = [embedding.astype(np.float16).tobytes() for embedding in embeddings]
+        for key, payload in zip(keys, payloads):
+            self.local.set(key, payload, self.ttl)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, payload in zip(keys, payloads):
+                    pipe.set(key, payload, ex=self.ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Embedding cache set error: %s", e)
+    
+    def get_stats(self) -> dict:
+        """Get hit/miss counters"""
+        lookups = self._l1_hits + self._l2_hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "l1_hits": self._l1_hits,
+            "l2_hits": self._l2_hits,
+            "misses": self._misses,
+            "errors": self._errors,
+            "hit_rate": (self._l1_hits + self._l2_hits) / lookups if lookups else 0.0,
+            "l1_entries": len(self.local),
+            "l1_bytes": self.local.size_bytes
+        }
@@ -0,0 +1,192 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import asyncio
+import logging
+import os
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class _EncodeRequest:
+    """Texts from one caller and the future that receives their embeddings"""
+    
+    def __init__(self, texts: List[str], future: asyncio.Future):
+        self.texts = texts
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+class EmbeddingExecutor:
+    """Coalesces concurrent encode calls into batched forward passes
+    
+    Callers await encode(); a background task takes the first queued request,
+    waits up to EMBED_MAX_WAIT_MS for more until EMBED_MAX_BATCH_SIZE texts are
+    collected, and encodes them in one call on a dedicated thread. While a batch
+    is running, new requests queue up and form the next batch.
+    """
+    
+    def __init__(self, encode: Callable[[List[str]], np.ndarray]):
+        self.encode_batch = encode
+        self.max_batch_size = int(os.environ.get('EMBED_MAX_BATCH_SIZE', 64))
+        self.max_wait = float(os.environ.get('EMBED_MAX_WAIT_MS', 5)) / 1000
+        # One thread: batches run back to back and torch uses its own intra-op threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._requests = 0
+        self._texts = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._wait_ms = 0.0
+        self._max_wait_ms = 0.0
+        self._encode_ms = 0.0
+        self._errors = 0
+        self._restarts = 0
+        self._stopping = False
+        # Requests taken off the queue and not yet answered
+        self._current: List[_EncodeRequest] = []
+    
+    def _start(self):
+        self._task = asyncio.create_task(self._run())
+        self._task.add_done_callback(self._on_task_done)
+    
+    def _on_task_done(self, task: asyncio.Task):
+        """Fail every outstanding request and start over if the batching task died"""
+        if self._stopping or task is not self._task:
+            return
+        if task.cancelled():
+            # Cancelled from outside (e.g. the loop shutting down): the next encode() starts a new one
+            error = RuntimeError("Embedding batching task was cancelled")
+            self._task = None
+        else:
+            error = task.exception() or RuntimeError("Embedding batching task exited")
+            logger.error("Embedding batching task died, restarting: %r", error)
+        self._fail(self._current, error)
+        self._current = []
+        while not self._queue.empty():
+            self._fail([self._queue.get_nowait()], error)
+        if self._task is not None:
+            self._restarts += 1
+            self._start()
+    
+    def _fail(self, batch: List[_EncodeRequest], error: BaseException):
+        for request in batch:
+            if not request.future.done():
+                request.future.set_exception(error)
+    
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings for texts, one row per text, encoded together with concurrent calls"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_EncodeRequest(texts, future))
+        return await future
+    
+    async def encode_one(self, text: str) -> np.ndarray:
+        """Embedding of a single text"""
+        return (await self.encode([text]))[0]
+    
+    async def _collect(self) -> List[_EncodeRequest]:
+        """The next batch: the first queued request plus whatever arrives within max_wait
+        
+        Requests are collected into self._current as they are dequeued, so none
+        is lost if the task dies while collecting.
+        """
+        batch = self._current
+        batch.append(await self._queue.get())
+        size = len(batch[0].texts)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                request = self._queue.get_nowait()
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+    
+    async def _run(self):
+        while True:
+            self._current = []
+            await self._collect()
+            # Callers that gave up (e.g. a cancelled request) are left out
+            batch = [request for request in self._current if not request.future.done()]
+            if batch:
+                try:
+                    await self._encode(batch)
+                except Exception as e:
+                    # Only this batch's callers see the error; the loop carries on
+                    self._errors += 1
+                    logger.warning("Embedding batch of %d requests failed: %s", len(batch), e)
+                    self._fail(batch, e)
+            self._current = []
+    
+    async def _encode(self, batch: List[_EncodeRequest]):
+        """Encode one batch and hand each caller its rows"""
+        started = time.perf_counter()
+        texts = [text for request in batch for text in request.texts]
+        for request in batch:
+            wait_ms = (started - request.enqueued_at) * 1000
+            self._wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+        self._requests += len(batch)
+        self._texts += len(texts)
+        self._batches += 1
+        self._max_batch = max(self._max_batch, len(texts))
+        
+        try:
+            embeddings = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.encode_batch, texts
+            )
+        finally:
+            self._encode_ms += (time.perf_counter() - started) * 1000
+        
+        offset = 0
+        for request in batch:
+            end = offset + len(request.texts)
+            if not request.future.done():
+                request.future.set_result(embeddings[offset:end])
+            offset = end
+    
+    async def stop(self):
+        """Stop the batching task, failing anything still queued, and the thread"""
+        if self._task is not None:
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            error = RuntimeError("Embedding executor stopped")
+            self._fail(self._current, error)
+            self._current = []
+            while not self._queue.empty():
+                self._fail([self._queue.get_nowait()], error)
+        self._executor.shutdown(wait=False)
+    
+    def get_stats(self) -> dict:
+        """Get batch size and queue wait counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self._requests,
+            "texts": self._texts,
+            "batches": self._batches,
+            "errors": self._errors,
+            "restarts": self._restarts,
+            "avg_batch_size": self._texts / self._batches if self._batches else 0.0,
+            "largest_batch": self._max_batch,
+            "avg_queue_wait_ms": self._wait_ms / self._requests if self._requests else 0.0,
+            "max_queue_wait_ms": self._max_wait_ms,
+            "avg_encode_ms": self._encode_ms / self._batches if self._batches else 0.0
+        }
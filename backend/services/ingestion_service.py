@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import os
+from typing import Optional, Set
+from rq import Queue, Retry
+from redis import Redis
+from repositories.knowledge_repository import KnowledgeRepository
+from services.knowledge_service import knowledge_service
+from services.redis_pool import redis_pool
+
+logger = logging.getLogger(__name__)
+
+class IngestionService:
+    """Queues knowledge document ingestion on RQ (Single Responsibility)
+    
+    RQ jobs run in other processes, so they can only write vectors when the
+    API and the workers share a Chroma server (CHROMA_HOST). Without one, the
+    document is ingested by a background task in the API process, which owns
+    the local store.
+    """
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        # RQ is synchronous, so enqueueing runs in a worker thread
+        self.redis = redis or redis_pool.sync_client
+        self.queue = Queue('knowledge_ingestion', connection=self.redis)
+        self.job_timeout = int(os.environ.get('KNOWLEDGE_JOB_TIMEOUT', 1800))
+        # Job-level retries re-run only the pages that have not been ingested
+        self.job_retries = int(os.environ.get('KNOWLEDGE_JOB_RETRIES', 2))
+        # Strong references keep in-process ingestion tasks alive until they finish
+        self._local_tasks: Set[asyncio.Task] = set()
+    
+    async def ingest_document(
+        self,
+        knowledge_repo: KnowledgeRepository,
+        knowledge_id: str,
+        user_id: str,
+        file_path: str
+    ) -> dict:
+        """Queue chunking and embedding of an uploaded file - background job"""
+        if not knowledge_service.shared_store:
+            return self._ingest_locally(knowledge_repo, knowledge_id, user_id, file_path)
+        
+        job = await asyncio.to_thread(
+            self.queue.enqueue,
+            'workers.knowledge_worker.ingest_document_job',
+            knowledge_id,
+            user_id,
+            file_path,
+            job_id=f"knowledge_{knowledge_id}",
+            job_timeout=self.job_timeout,
+            retry=Retry(max=self.job_retries, interval=[10, 60]) if self.job_retries else None
+        )
+        return {"job_id": job.id, "status": "queued"}
+    
+    def _ingest_locally(
+        self,
+        knowledge_repo: KnowledgeRepository,
+        knowledge_id: str,
+        user_id: str,
+        file_path: str
+    ) -> dict:
+        """Ingest in a task of this process; there are no job retries, only per-page attempts"""
+        from workers.knowledge_worker import ingest
+        
+        async def run():
+            try:
+                await ingest(knowledge_repo, knowledge_id, user_id, file_path)
+            except Exception as e:
+                logger.error("In-process ingestion of %s failed: %s", knowledge_id, e)
+                await knowledge_repo.update(knowledge_id, {"status": "failed", "error": str(e)})
+        
+        task = asyncio.create_task(run())
+        self._local_tasks.add(task)
+        task.add_done_callback(self._local_tasks.discard)
+        return {"job_id": f"local_knowledge_{knowledge_id}", "status": "processing"}
+    
+    async def stop(self):
+        """Cancel in-process ingestion; interrupted entries stay pending"""
+        for task in list(self._local_tasks):
+            task.cancel()
+        await asyncio.gather(*self._local_tasks, return_exceptions=True)
+
+ingestion_service = IngestionService()
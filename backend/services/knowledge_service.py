@@ -1,64 +1,235 @@
-from sentence_transformers import SentenceTransformer
-from chromadb import Client
-from chromadb.config import Settings
+import asyncio
+import logging
 import os
-from typing import List, Dict
-import uuid
+import threading
+import time
+import numpy as np
+from services.embedding_cache import EmbeddingCache
+from services.embedding_executor import EmbeddingExecutor
+from services.embedders import Embedder, create_embedder
+from services.text_chunker import TextChunker
+from services.vector_layout import CollectionLayout, create_layout
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 class KnowledgeService:
-    """Service for knowledge base and RAG operations (Single Responsibility)"""
+    """Service for knowledge base and RAG operations (Single Responsibility)
+    
+    The embedding model and ChromaDB client are created on first use, or
+    ahead of it by warm_up(), so importing this module stays cheap.
+    """
     
     def __init__(self):
-        # Initialize sentence transformer for embeddings
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model_name = 'all-MiniLM-L6-v2'
+        self.chunk_tokens = int(os.environ.get('KNOWLEDGE_CHUNK_TOKENS', 200))
+        self.chunk_overlap = int(os.environ.get('KNOWLEDGE_CHUNK_OVERLAP', 40))
+        self.embed_batch_size = int(os.environ.get('KNOWLEDGE_EMBED_BATCH_SIZE', 32))
+        # Chunks embedded and written to ChromaDB per add call
+        self.add_batch_size = int(os.environ.get('KNOWLEDGE_ADD_BATCH_SIZE', 256))
+        self.persist_directory = os.environ.get('CHROMA_PERSIST_DIR', '/app/backend/chroma_db')
+        # With CHROMA_HOST set, every process talks to one Chroma server instead
+        self.chroma_host = os.environ.get('CHROMA_HOST')
+        self.chroma_port = int(os.environ.get('CHROMA_PORT', 8000))
         
-        # Initialize ChromaDB
-        self.chroma_client = Client(Settings(
-            persist_directory="/app/backend/chroma_db",
-            anonymized_telemetry=False
-        ))
+        # EMBEDDING_BACKEND selects PyTorch or ONNX Runtime; the model loads on first use
+        self.embedder: Embedder = create_embedder(self.model_name)
+        # Query-time encodes from concurrent requests share forward passes
+        self.executor = EmbeddingExecutor(self._encode)
+        self.embedding_cache = EmbeddingCache(self.embedder.name)
+        
+        self._chunker: Optional[TextChunker] = None
+        self._chroma_client = None
+        self._layout: Optional[CollectionLayout] = None
+        # Request threads and the warm-up thread may all hit first use at once
+        self._load_lock = threading.Lock()
+        self._warm = False
+        self._load_seconds: Optional[float] = None
+        self._load_error: Optional[str] = None
     
-    def get_or_create_collection(self, user_id: str):
-        """Get or create user's knowledge collection"""
-        collection_name = f"user_{user_id}_knowledge"
-        return self.chroma_client.get_or_create_collection(name=collection_name)
+    @property
+    def chunker(self) -> TextChunker:
+        """Chunker using the embedder's tokenizer, built on first use"""
+        if self._chunker is None:
+            with self._load_lock:
+                if self._chunker is None:
+                    # Chunks stay within the model's input window (256 tokens for MiniLM),
+                    # which silently truncates anything longer. The window includes the
+                    # special tokens the encoder adds ([CLS] and [SEP]); chunks are
+                    # counted without them.
+                    tokenizer = self.embedder.tokenizer
+                    special_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+                    self._chunker = TextChunker(
+                        tokenizer,
+                        min(self.chunk_tokens, self.embedder.max_seq_length - special_tokens),
+                        self.chunk_overlap
+                    )
+        return self._chunker
     
-    async def add_knowledge(self, user_id: str, document: str, metadata: dict) -> str:
-        """Add document to user's knowledge base"""
-        collection = self.get_or_create_collection(user_id)
+    @property
+    def chroma_client(self):
+        """ChromaDB client, created on first use
+        
+        Vectors persist in persist_directory (or on the Chroma server), so they
+        survive restarts; scripts/reindex_knowledge.py rebuilds them from Mongo.
+        """
+        if self._chroma_client is None:
+            with self._load_lock:
+                if self._chroma_client is None:
+                    import chromadb
+                    from chromadb.config import Settings
+                    settings = Settings(anonymized_telemetry=False)
+                    if self.chroma_host:
+                        self._chroma_client = chromadb.HttpClient(
+                            host=self.chroma_host, port=self.chroma_port, settings=settings
+                        )
+                    else:
+                        self._chroma_client = chromadb.PersistentClient(
+                            path=self.persist_directory, settings=settings
+                        )
+        return self._chroma_client
+    
+    @property
+    def layout(self) -> CollectionLayout:
+        """Which collection holds each user's chunks (KNOWLEDGE_COLLECTION_LAYOUT)"""
+        if self._layout is None:
+            client = self.chroma_client
+            with self._load_lock:
+                if self._layout is None:
+                    self._layout = create_layout(client)
+        return self._layout
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded and has run a forward pass"""
+        return self._warm
+    
+    @property
+    def shared_store(self) -> bool:
+        """Whether vectors live on a Chroma server that other processes can reach
+        
+        A PersistentClient directory must only be opened by one process, so
+        writers outside the API process (RQ jobs) need CHROMA_HOST.
+        """
+        return bool(self.chroma_host)
+    
+    def load_model(self):
+        """Load the embedding model and run one forward pass (blocking)"""
+        self.chunker
+        # The first encode allocates buffers and is much slower than the rest
+        self._encode(["warm up"])
+    
+    def load(self):
+        """Load the model and vector store (blocking)"""
+        start = time.perf_counter()
+        self.load_model()
+        self.layout
+        self._load_seconds = time.perf_counter() - start
+    
+    async def warm_up(self):
+        """Load everything in a worker thread so the first request does not pay for it"""
+        try:
+            await asyncio.to_thread(self.load)
+            logger.info("Embedding model %s ready in %.1fs", self.embedder.name, self._load_seconds)
+        except Exception as e:
+            self._load_error = str(e)
+            logger.error("Embedding model warm-up failed: %s", e)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = self.embedder.encode(texts, batch_size=self.embed_batch_size)
+        self._warm = True
+        return embeddings
+    
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeddings of texts, served from the embedding cache where possible
         
-        # Generate embedding
-        embedding = self.embedder.encode(document).tolist()
+        Misses are batched with other concurrent encodes off the event loop.
+        """
+        cached = await self.embedding_cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embeddings = await self.executor.encode(missing_texts)
+            await self.embedding_cache.set_many(missing_texts, embeddings)
+            for i, embedding in zip(missing, embeddings):
+                cached[i] = embedding
+        return np.stack(cached)
+    
+    async def embed_query(self, text: str) -> np.ndarray:
+        """Embedding of a single query"""
+        return (await self.embed([text]))[0]
+    
+    def get_or_create_collection(self, user_id: str):
+        """Get or create the collection holding user's knowledge"""
+        return self.layout.collection(user_id)
+    
+    async def add_knowledge(
+        self,
+        user_id: str,
+        knowledge_id: str,
+        document: str,
+        metadata: dict,
+        page: Optional[int] = None
+    ) -> int:
+        """Chunk, embed and store a document (or one page of it); returns the number of chunks
         
-        # Generate unique ID
-        doc_id = str(uuid.uuid4())
+        Chunk ids are "<knowledge_id>:<index>", or "<knowledge_id>:<page>:<index>"
+        for a page, and every chunk carries knowledge_id in its metadata, so
+        delete_knowledge removes all of them. Chunks are upserted, so storing
+        the same page again replaces it.
+        """
+        return await asyncio.to_thread(self._add_knowledge, user_id, knowledge_id, document, metadata, page)
+    
+    def _add_knowledge(
+        self,
+        user_id: str,
+        knowledge_id: str,
+        document: str,
+        metadata: dict,
+        page: Optional[int] = None
+    ) -> int:
+        """Blocking implementation of add_knowledge"""
+        collection = self.get_or_create_collection(user_id)
+        chunks = self.chunker.split(document)
+        prefix = knowledge_id if page is None else f"{knowledge_id}:{page}"
+        metadata = {**metadata, "user_id": user_id, "knowledge_id": knowledge_id}
+        if page is not None:
+            metadata["page"] = page
         
-        # Add to ChromaDB
-        collection.add(
-            embeddings=[embedding],
-            documents=[document],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
+        for start in range(0, len(chunks), self.add_batch_size):
+            batch = chunks[start:start + self.add_batch_size]
+            embeddings = self.embedder.encode(batch, batch_size=self.embed_batch_size)
+            collection.upsert(
+                embeddings=embeddings.tolist(),
+                documents=batch,
+                metadatas=[{**metadata, "chunk": start + i} for i in range(len(batch))],
+                ids=[f"{prefix}:{start + i}" for i in range(len(batch))]
+            )
         
-        return doc_id
+        return len(chunks)
     
     async def search_knowledge(
         self, 
         user_id: str, 
         query: str, 
-        top_k: int = 3
+        top_k: int = 3,
+        query_embedding: Optional[np.ndarray] = None
     ) -> List[Dict]:
-        """Search user's knowledge base"""
+        """Search user's knowledge base (query_embedding: the query's vector, if already computed)"""
+        if query_embedding is None:
+            query_embedding = await self.embed_query(query)
+        # Vector search is CPU-bound too; keep it off the event loop
+        return await asyncio.to_thread(self._search_knowledge, user_id, query_embedding.tolist(), top_k)
+    
+    def _search_knowledge(self, user_id: str, query_embedding: List[float], top_k: int) -> List[Dict]:
+        """Blocking implementation of search_knowledge"""
         collection = self.get_or_create_collection(user_id)
         
-        # Generate query embedding
-        query_embedding = self.embedder.encode(query).tolist()
-        
         # Search in ChromaDB
         results = collection.query(
             query_embeddings=[query_embedding],
-            n_results=top_k
+            n_results=top_k,
+            where=self.layout.where(user_id)
         )
         
         # Format results
@@ -73,14 +244,36 @@ class KnowledgeService:
         
         return formatted_results
     
-    async def delete_knowledge(self, user_id: str, doc_id: str) -> bool:
-        """Delete document from knowledge base"""
+    async def delete_knowledge(self, user_id: str, knowledge_id: str, embedding_id: Optional[str] = None) -> bool:
+        """Delete every chunk of a document from knowledge base"""
         try:
-            collection = self.get_or_create_collection(user_id)
-            collection.delete(ids=[doc_id])
+            collection = await asyncio.to_thread(self.get_or_create_collection, user_id)
+            await asyncio.to_thread(
+                collection.delete,
+                where=self.layout.where(user_id, knowledge_id=knowledge_id)
+            )
+            # Entries stored before chunking have a single vector under a random id
+            if embedding_id and embedding_id != knowledge_id:
+                await asyncio.to_thread(collection.delete, ids=[embedding_id])
             return True
         except Exception as e:
             print(f"Delete knowledge error: {e}")
             return False
+    
+    async def close(self):
+        """Stop the embedding executor"""
+        await self.executor.stop()
+    
+    def get_stats(self) -> dict:
+        """Get model state, embedding cache and batching counters"""
+        return {
+            "model": self.embedder.name,
+            "ready": self._warm,
+            "load_seconds": self._load_seconds,
+            "load_error": self._load_error,
+            "collections": self._layout.get_stats() if self._layout is not None else None,
+            "cache": self.embedding_cache.get_stats(),
+            "executor": self.executor.get_stats()
+        }
 
 knowledge_service = KnowledgeService()
\ No newline at end of file
@@ -1,15 +1,137 @@
-from groq import Groq
+from contextlib import asynccontextmanager
+import asyncio
+import httpx
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+class LLMOverloadedError(Exception):
+    """Raised when the LLM wait queue is full or no slot frees up in time"""
+
+class LLMTokenStream:
+    """Async iterator over streamed completion tokens that holds an LLM slot until closed"""
+    
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+        self._closed = False
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise Exception(f"LLM streaming error: {str(e)}")
+        finally:
+            await self.aclose()
+    
+    async def aclose(self):
+        """Close the upstream stream and release the slot (idempotent)"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._stream.close()
+        finally:
+            self._release()
 
 class LLMService:
     """Service for Groq LLM operations (Single Responsibility)"""
     
     def __init__(self):
-        self.client = Groq(
-            api_key=os.environ.get('GROQ_API_KEY')
-        )
         self.model = "llama-3.1-70b-versatile"
+        
+        # Concurrency limits: at most max_concurrency calls in flight, at most
+        # max_queue callers waiting for a slot, each for at most queue_timeout seconds
+        self.max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+        self.max_queue = int(os.environ.get('LLM_MAX_QUEUE', 64))
+        self.queue_timeout = float(os.environ.get('LLM_QUEUE_TIMEOUT', 5))
+        # Built on first use so importing the service stays cheap
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self._client = None
+        
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+    
+    @property
+    def client(self):
+        """Groq client over a shared HTTP connection pool, created on first use"""
+        if self._client is None:
+            from groq import AsyncGroq
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                timeout=httpx.Timeout(
+                    float(os.environ.get('LLM_REQUEST_TIMEOUT', 60)),
+                    connect=5.0
+                )
+            )
+            # GROQ_BASE_URL can point at a local stub server for load tests
+            self._client = AsyncGroq(
+                api_key=os.environ.get('GROQ_API_KEY'),
+                base_url=os.environ.get('GROQ_BASE_URL') or None,
+                max_retries=int(os.environ.get('LLM_MAX_RETRIES', 1)),
+                http_client=self.http_client
+            )
+        return self._client
+    
+    async def _acquire_slot(self):
+        """Wait for a free LLM slot, shedding load when the queue is full"""
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise LLMOverloadedError("LLM request queue is full")
+        
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            raise LLMOverloadedError("Timed out waiting for an LLM slot")
+        finally:
+            self._waiting -= 1
+        
+        self._in_flight += 1
+    
+    def _release_slot(self):
+        """Return a slot to the pool"""
+        self._in_flight -= 1
+        self._completed += 1
+        self._slots.release()
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold an LLM slot for the duration of the block"""
+        await self._acquire_slot()
+        try:
+            yield
+        finally:
+            self._release_slot()
+    
+    def get_stats(self) -> dict:
+        """Get concurrency and load-shedding counters"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out
+        }
+    
+    async def close(self):
+        """Close the shared HTTP connection pool"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
     
     def generate_personality_prompt(self, user_data: dict) -> str:
         """Generate system prompt based on user personality"""
@@ -27,52 +149,70 @@ Respond naturally as {name} would, maintaining consistency with your personality
         return prompt
     
     async def generate_response(
-        self, 
-        messages: List[Dict[str, str]], 
+        self,
+        messages: List[Dict[str, str]],
         personality_prompt: str,
         max_tokens: int = 500,
         temperature: float = 0.7
     ) -> str:
         """Generate response from Groq LLM"""
-        try:
-            system_message = {"role": "system", "content": personality_prompt}
-            full_messages = [system_message] + messages
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=full_messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"LLM generation error: {str(e)}")
+        async with self.slot():
+            try:
+                system_message = {"role": "system", "content": personality_prompt}
+                full_messages = [system_message] + messages
+                
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=full_messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                
+                return response.choices[0].message.content
+            except Exception as e:
+                raise Exception(f"LLM generation error: {str(e)}")
     
-    async def generate_streaming_response(
+    async def open_stream(
         self,
         messages: List[Dict[str, str]],
         personality_prompt: str,
         max_tokens: int = 500,
         temperature: float = 0.7
-    ):
-        """Generate streaming response from Groq LLM"""
+    ) -> LLMTokenStream:
+        """Reserve a slot and start a streaming completion before any token is sent"""
+        await self._acquire_slot()
         try:
             system_message = {"role": "system", "content": personality_prompt}
             full_messages = [system_message] + messages
             
-            stream = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=full_messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 stream=True
             )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
         except Exception as e:
+            self._release_slot()
             raise Exception(f"LLM streaming error: {str(e)}")
+        
+        return LLMTokenStream(stream, self._release_slot)
+    
+    async def generate_streaming_response(
+        self,
+        messages: List[Dict[str, str]],
+        personality_prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7
+    ):
+        """Generate streaming response from Groq LLM"""
+        token_stream = await self.open_stream(
+            messages,
+            personality_prompt,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        async for token in token_stream:
+            yield token
 
-llm_service = LLMService()
\ No newline at end of file
+llm_service = LLMService()
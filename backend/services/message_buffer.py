@@ -0,0 +1,144 @@
+from models.conversation import Message
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Writes a batch {conversation_id: messages} and returns the messages that failed
+BatchWriter = Callable[[Dict[str, List[Message]]], Awaitable[Dict[str, List[Message]]]]
+
+class MessageWriteBuffer:
+    """Optional write-behind buffer for message appends
+    
+    Appends are grouped per conversation and written by a background task every
+    MESSAGE_WRITE_BEHIND_INTERVAL_MS, or as soon as MESSAGE_WRITE_BEHIND_MAX_PENDING
+    messages are waiting. Buffered and in-flight messages are visible to reads
+    in this worker through pending(); the buffer is flushed on shutdown.
+    """
+    
+    def __init__(self):
+        self.enabled = os.environ.get('MESSAGE_WRITE_BEHIND', 'false').lower() == 'true'
+        self.interval = int(os.environ.get('MESSAGE_WRITE_BEHIND_INTERVAL_MS', 50)) / 1000
+        self.max_pending = int(os.environ.get('MESSAGE_WRITE_BEHIND_MAX_PENDING', 500))
+        self.max_attempts = 3
+        self._pending: Dict[str, List[Message]] = {}
+        self._inflight: Dict[str, List[Message]] = {}
+        self._pending_count = 0
+        self._attempts: Dict[str, int] = {}
+        self._writer: Optional[BatchWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flushes = 0
+        self._written = 0
+        self._retried = 0
+        self._dropped = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+    
+    def add(self, conversation_id: str, messages: List[Message]):
+        """Queue messages for conversation_id"""
+        self._pending.setdefault(conversation_id, []).extend(messages)
+        self._pending_count += len(messages)
+        if self._pending_count >= self.max_pending:
+            self._wakeup.set()
+    
+    def pending(self, conversation_id: str) -> List[Message]:
+        """Messages accepted for conversation_id that may not be in Mongo yet, in order"""
+        return self._inflight.get(conversation_id, []) + self._pending.get(conversation_id, [])
+    
+    def discard(self, conversation_id: str):
+        """Drop queued messages of a deleted conversation"""
+        messages = self._pending.pop(conversation_id, [])
+        self._pending_count -= len(messages)
+        self._attempts.pop(conversation_id, None)
+    
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending, self._pending_count = self._pending, {}, 0
+            self._inflight = batch
+            try:
+                failed = await self._writer(batch)
+            except Exception as e:
+                logger.error("Message flush failed: %s", e)
+                failed = batch
+            finally:
+                self._inflight = {}
+            
+            self._flushes += 1
+            for conversation_id, messages in batch.items():
+                if conversation_id not in failed:
+                    self._written += len(messages)
+                    self._attempts.pop(conversation_id, None)
+            self._requeue(failed)
+    
+    def _requeue(self, failed: Dict[str, List[Message]]):
+        """Put failed messages back ahead of newer ones, up to max_attempts"""
+        for conversation_id, messages in failed.items():
+            attempts = self._attempts.get(conversation_id, 0) + 1
+            if attempts >= self.max_attempts:
+                self._attempts.pop(conversation_id, None)
+                self._dropped += len(messages)
+                logger.error(
+                    "Dropping %d messages for conversation %s after %d attempts",
+                    len(messages), conversation_id, attempts
+                )
+                continue
+            self._attempts[conversation_id] = attempts
+            self._retried += len(messages)
+            self._pending[conversation_id] = messages + self._pending.get(conversation_id, [])
+            self._pending_count += len(messages)
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    async def start(self, writer: BatchWriter):
+        """Start the flush loop if write-behind is enabled"""
+        if not self.enabled or self._task is not None:
+            return
+        self._writer = writer
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task is None:
+            return
+        # Holding the lock means the loop is not in the middle of a write
+        async with self._flush_lock:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Failed batches are requeued; keep going until written or dropped
+        while self._pending:
+            await self.flush()
+    
+    def get_stats(self) -> dict:
+        """Get flush counters"""
+        return {
+            "enabled": self.enabled,
+            "pending": self._pending_count,
+            "flushes": self._flushes,
+            "written": self._written,
+            "retried": self._retried,
+            "dropped": self._dropped
+        }
+
+message_buffer = MessageWriteBuffer()
@@ -0,0 +1,205 @@
+from redis.asyncio import Redis
+from services.redis_pool import redis_pool
+from typing import Dict, List, Optional
+import json
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Approximate sliding window: the previous fixed window is weighted by how much
+# of it still overlaps the sliding window. KEYS: current window, previous window.
+# ARGV: limit, window_ms, now_ms, cost. Returns {allowed, remaining, retry_after_ms}.
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local offset = now % window
+local estimated = previous * (1 - offset / window) + current
+if estimated + cost > limit then
+    local retry = window - offset
+    if previous > 0 and limit - current - cost >= 0 then
+        local needed = (1 - (limit - current - cost) / previous) * window
+        retry = math.max(1, math.ceil(needed - offset))
+    end
+    return {0, math.max(0, math.floor(limit - estimated)), retry}
+end
+redis.call('INCRBY', KEYS[1], cost)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.max(0, math.floor(limit - estimated - cost)), 0}
+"""
+
+# Token bucket stored as a hash of {tokens, ts}. KEYS: bucket.
+# ARGV: capacity, refill_per_ms, now_ms, cost. Returns {allowed, remaining, retry_after_ms}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = math.ceil((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return {allowed, math.floor(tokens), retry}
+"""
+
+class RateLimitRule:
+    """A limit applied to requests whose path starts with one of path_prefixes"""
+    
+    def __init__(
+        self,
+        name: str,
+        path_prefixes: List[str],
+        limit: int,
+        window_seconds: int,
+        algorithm: str = "sliding_window",
+        burst: Optional[int] = None
+    ):
+        self.name = name
+        self.path_prefixes = path_prefixes
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.algorithm = algorithm
+        # Token bucket capacity; defaults to the full limit
+        self.burst = burst or limit
+    
+    def matches(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.path_prefixes)
+
+class RateLimitDecision:
+    """Outcome of one rate-limit check"""
+    
+    def __init__(self, rule: RateLimitRule, limit: int, allowed: bool, remaining: int, retry_after_ms: int):
+        self.rule = rule
+        self.limit = limit
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after_ms = retry_after_ms
+    
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Policy": f"{self.rule.name};w={self.rule.window_seconds}"
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after_ms / 1000)))
+        return headers
+
+class RateLimiter:
+    """Per-route, per-user rate limits enforced atomically in Redis"""
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        self.enabled = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+        self.redis = redis or redis_pool.client
+        self._sliding_window = self.redis.register_script(SLIDING_WINDOW_LUA)
+        self._token_bucket = self.redis.register_script(TOKEN_BUCKET_LUA)
+        
+        # Most specific rules first; the first match wins
+        self.rules = [
+            RateLimitRule(
+                "chat",
+                ["/api/chat/send", "/api/chat/stream"],
+                limit=int(os.environ.get('RATE_LIMIT_CHAT_PER_MINUTE', 20)),
+                window_seconds=60,
+                algorithm="token_bucket",
+                burst=int(os.environ.get('RATE_LIMIT_CHAT_BURST', 5))
+            ),
+            RateLimitRule(
+                "knowledge_upload",
+                ["/api/knowledge/upload"],
+                limit=int(os.environ.get('RATE_LIMIT_UPLOAD_PER_HOUR', 20)),
+                window_seconds=3600
+            ),
+            RateLimitRule(
+                "auth",
+                ["/api/auth/login", "/api/auth/register"],
+                limit=int(os.environ.get('RATE_LIMIT_AUTH_PER_MINUTE', 10)),
+                window_seconds=60
+            ),
+            RateLimitRule(
+                "default",
+                ["/api/"],
+                limit=int(os.environ.get('RATE_LIMIT_PER_MINUTE', 60)),
+                window_seconds=60
+            ),
+        ]
+        self.exempt_paths = {"/api/health", "/api/health/live", "/api/health/ready"}
+        
+        # {"<user_id>": {"<rule name>": <limit>}} for users with custom quotas
+        self.user_overrides: Dict[str, Dict[str, int]] = json.loads(
+            os.environ.get('RATE_LIMIT_USER_OVERRIDES', '{}')
+        )
+        
+        self._allowed: Dict[str, int] = {}
+        self._limited: Dict[str, int] = {}
+        self._errors = 0
+    
+    def match(self, path: str) -> Optional[RateLimitRule]:
+        """Find the rule for a request path"""
+        if not self.enabled or path in self.exempt_paths:
+            return None
+        for rule in self.rules:
+            if rule.matches(path):
+                return rule
+        return None
+    
+    async def hit(self, rule: RateLimitRule, identity: str, user_id: Optional[str] = None, cost: int = 1) -> Optional[RateLimitDecision]:
+        """Consume quota for identity; returns None if Redis is unavailable (fail open)"""
+        limit = self.user_overrides.get(user_id, {}).get(rule.name, rule.limit) if user_id else rule.limit
+        now_ms = int(time.time() * 1000)
+        window_ms = rule.window_seconds * 1000
+        
+        try:
+            if rule.algorithm == "token_bucket":
+                allowed, remaining, retry_ms = await self._token_bucket(
+                    keys=[f"ratelimit:{rule.name}:{identity}"],
+                    args=[rule.burst, limit / window_ms, now_ms, cost]
+                )
+            else:
+                current_window = now_ms // window_ms
+                allowed, remaining, retry_ms = await self._sliding_window(
+                    keys=[
+                        f"ratelimit:{rule.name}:{identity}:{current_window}",
+                        f"ratelimit:{rule.name}:{identity}:{current_window - 1}"
+                    ],
+                    args=[limit, window_ms, now_ms, cost]
+                )
+        except Exception as e:
+            self._errors += 1
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return None
+        
+        counters = self._allowed if allowed else self._limited
+        counters[rule.name] = counters.get(rule.name, 0) + 1
+        return RateLimitDecision(rule, limit, bool(allowed), int(remaining), int(retry_ms))
+    
+    def get_stats(self) -> dict:
+        """Get allowed/limited counters per rule"""
+        return {
+            "enabled": self.enabled,
+            "allowed": dict(self._allowed),
+            "limited": dict(self._limited),
+            "errors": self._errors
+        }
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,80 @@
+from redis import Redis, BlockingConnectionPool
+from redis.asyncio import Redis as AsyncRedis, BlockingConnectionPool as AsyncBlockingConnectionPool
+from typing import Optional
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class RedisConnections:
+    """Process-wide Redis connection pools shared by every service"""
+    
+    def __init__(self):
+        self.host = os.environ.get('REDIS_HOST', 'localhost')
+        self.port = int(os.environ.get('REDIS_PORT', 6379))
+        self.db = int(os.environ.get('REDIS_DB', 0))
+        self.max_connections = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+        self.socket_timeout = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2.0))
+        self.connect_timeout = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 2.0))
+        # How long a caller waits for a free connection when the pool is exhausted
+        self.pool_timeout = float(os.environ.get('REDIS_POOL_TIMEOUT', 1.0))
+        self.health_check_interval = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
+        self._client: Optional[AsyncRedis] = None
+        self._sync_client: Optional[Redis] = None
+    
+    def _pool_kwargs(self) -> dict:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "db": self.db,
+            "max_connections": self.max_connections,
+            "timeout": self.pool_timeout,
+            "socket_timeout": self.socket_timeout,
+            "socket_connect_timeout": self.connect_timeout,
+            "health_check_interval": self.health_check_interval
+        }
+    
+    @property
+    def client(self) -> AsyncRedis:
+        """Shared asyncio client; values are returned as bytes"""
+        if self._client is None:
+            self._client = AsyncRedis(connection_pool=AsyncBlockingConnectionPool(**self._pool_kwargs()))
+        return self._client
+    
+    @property
+    def sync_client(self) -> Redis:
+        """Shared blocking client for RQ, which has no asyncio support"""
+        if self._sync_client is None:
+            self._sync_client = Redis(connection_pool=BlockingConnectionPool(**self._pool_kwargs()))
+        return self._sync_client
+    
+    async def connect(self):
+        """Open the async pool at startup and verify Redis is reachable"""
+        try:
+            await self.client.ping()
+        except Exception as e:
+            logger.warning("Redis is not reachable at startup: %s", e)
+    
+    def get_stats(self) -> dict:
+        """Get connection counts of the async pool"""
+        if self._client is None:
+            return {"max_connections": self.max_connections, "in_use": 0, "idle": 0}
+        pool = self._client.connection_pool
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(pool._in_use_connections),
+            "idle": len(pool._available_connections)
+        }
+    
+    async def close(self):
+        """Close both pools"""
+        if self._client is not None:
+            await self._client.aclose()
+            await self._client.connection_pool.disconnect()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client.connection_pool.disconnect()
+            self._sync_client = None
+
+redis_pool = RedisConnections()
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+from services.knowledge_service import knowledge_service
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _PUNCTUATION.sub(" ", text.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _history_digest(history: List[Dict[str, str]], summary: Optional[str]) -> str:
+    return _digest(json.dumps([summary or "", [[m["role"], m["content"]] for m in history]]))
+
+class CacheProbe:
+    """Lookup key for one question, reused to store the reply on a miss
+    
+    history is the conversation the question is asked in (prior turns in the
+    window, without the question itself) and summary the rolling summary of
+    older turns: "why?" only has the same answer in the same conversation.
+    """
+    
+    def __init__(
+        self,
+        user_id: str,
+        question: str,
+        personality_prompt: str,
+        rag_context: str,
+        history: List[Dict[str, str]],
+        summary: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None
+    ):
+        self.user_id = user_id
+        self.question = normalize_question(question)
+        # Replies are only comparable when prompt, retrieved context and conversation match
+        self.scope = f"{_digest(personality_prompt)}:{_digest(rag_context)}:{_history_digest(history, summary)}"
+        self.key = f"{self.scope}:{_digest(self.question)}"
+        self.embedding = None if embedding is None else embedding / np.linalg.norm(embedding)
+
+class ResponseCache:
+    """Per-user TTL/LRU cache of LLM replies with optional semantic matching"""
+    
+    def __init__(self):
+        self.enabled = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.semantic_enabled = os.environ.get('RESPONSE_CACHE_SEMANTIC', 'true').lower() == 'true'
+        self.ttl = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+        self.max_entries_per_user = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 200))
+        self.max_users = int(os.environ.get('RESPONSE_CACHE_MAX_USERS', 5000))
+        self.similarity_threshold = float(os.environ.get('RESPONSE_CACHE_SIMILARITY', 0.92))
+        
+        # user_id -> OrderedDict(key -> entry), both in LRU order
+        self._users: OrderedDict = OrderedDict()
+        self._hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+    
+    def probe(
+        self,
+        user_id: str,
+        question: str,
+        personality_prompt: str,
+        rag_context: str,
+        history: List[Dict[str, str]],
+        summary: Optional[str] = None,
+        embedding: Optional[np.ndarray] = None
+    ) -> CacheProbe:
+        """Build the lookup key for a question
+        
+        Pass the question's embedding when it has already been computed (for
+        knowledge search) so semantic matching does not embed it again.
+        """
+        return CacheProbe(user_id, question, personality_prompt, rag_context, history, summary, embedding)
+    
+    def _entries(self, user_id: str) -> Optional[OrderedDict]:
+        entries = self._users.get(user_id)
+        if entries is not None:
+            self._users.move_to_end(user_id)
+        return entries
+    
+    async def _embed(self, probe: CacheProbe) -> np.ndarray:
+        if probe.embedding is None:
+            embedding = await knowledge_service.embed_query(probe.question)
+            probe.embedding = embedding / np.linalg.norm(embedding)
+        return probe.embedding
+    
+    def _find_similar(self, entries: OrderedDict, probe: CacheProbe, now: float) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in entries.items():
+            if entry["scope"] != probe.scope or entry["expires_at"] <= now:
+                continue
+            if entry["embedding"] is None:
+                continue
+            score = float(np.dot(entry["embedding"], probe.embedding))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+    
+    async def get(self, probe: CacheProbe) -> Optional[str]:
+        """Return a cached reply for the probe, exact match first"""
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        entries = self._entries(probe.user_id)
+        if entries:
+            entry = entries.get(probe.key)
+            if entry is not None:
+                if entry["expires_at"] > now:
+                    entries.move_to_end(probe.key)
+                    self._hits += 1
+                    return entry["response"]
+                del entries[probe.key]
+        
+        if self.semantic_enabled:
+            await self._embed(probe)
+            # The user's entries may have changed while the embedding ran
+            entries = self._entries(probe.user_id)
+            if entries:
+                key = self._find_similar(entries, probe, now)
+                if key is not None:
+                    entries.move_to_end(key)
+                    self._semantic_hits += 1
+                    return entries[key]["response"]
+        
+        self._misses += 1
+        return None
+    
+    def set(self, probe: CacheProbe, response: str):
+        """Store a reply, evicting least recently used entries and users"""
+        if not self.enabled or not response:
+            return
+        
+        entries = self._entries(probe.user_id)
+        if entries is None:
+            entries = OrderedDict()
+            self._users[probe.user_id] = entries
+            while len(self._users) > self.max_users:
+                _, evicted = self._users.popitem(last=False)
+                self._evictions += len(evicted)
+        
+        entries[probe.key] = {
+            "response": response,
+            "scope": probe.scope,
+            "embedding": probe.embedding,
+            "expires_at": time.time() + self.ttl
+        }
+        entries.move_to_end(probe.key)
+        while len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+            self._evictions += 1
+    
+    def invalidate_user(self, user_id: str):
+        """Drop every cached reply for a user (profile or knowledge changed)"""
+        if self._users.pop(user_id, None) is not None:
+            self._invalidations += 1
+    
+    def get_stats(self) -> dict:
+        """Get hit/miss counters"""
+        lookups = self._hits + self._semantic_hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "users": len(self._users),
+            "entries": sum(len(entries) for entries in self._users.values()),
+            "hits": self._hits,
+            "semantic_hits": self._semantic_hits,
+            "misses": self._misses,
+            "hit_rate": (self._hits + self._semantic_hits) / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations
+        }
+
+response_cache = ResponseCache()
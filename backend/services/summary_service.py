@@ -0,0 +1,75 @@
+from repositories.conversation_repository import ConversationRepository
+from services.llm_service import llm_service
+from typing import Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a person and their AI digital self.
+Update the existing summary with the new messages. Keep names, facts, preferences, decisions and open questions.
+Write in the third person, in plain prose, in at most {max_words} words. Reply with the summary only."""
+
+class ConversationSummarizer:
+    """Folds turns that fall out of the context window into Conversation.summary"""
+    
+    def __init__(self, conversation_repo: ConversationRepository):
+        self.conversation_repo = conversation_repo
+        self.min_messages = int(os.environ.get('SUMMARY_MIN_MESSAGES', 6))
+        self.max_messages = int(os.environ.get('SUMMARY_MAX_MESSAGES', 40))
+        self.max_tokens = int(os.environ.get('SUMMARY_MAX_TOKENS', 300))
+        self._in_flight = set()
+        self._tasks = set()
+    
+    def maybe_schedule(
+        self,
+        conversation_id: str,
+        summary: Optional[str],
+        summarized_count: int,
+        window_start: int
+    ):
+        """Start a background job if enough turns sit between the summary and the window"""
+        pending = window_start - summarized_count
+        if pending < self.min_messages or conversation_id in self._in_flight:
+            return
+        
+        # Only the next batch is folded in; later turns pick up the rest
+        end = min(window_start, summarized_count + self.max_messages)
+        self._in_flight.add(conversation_id)
+        task = asyncio.create_task(
+            self._summarize(conversation_id, summary, summarized_count, end)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _summarize(self, conversation_id: str, summary: Optional[str], start: int, end: int):
+        try:
+            messages = await self.conversation_repo.get_messages_slice(conversation_id, start, end)
+            if not messages:
+                return
+            
+            transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+            prompt = (
+                f"Existing summary:\n{summary or '(none)'}\n\n"
+                f"New messages:\n{transcript}"
+            )
+            new_summary = await llm_service.generate_response(
+                [{"role": "user", "content": prompt}],
+                SUMMARY_PROMPT.format(max_words=int(self.max_tokens * 0.6)),
+                max_tokens=self.max_tokens,
+                temperature=0.3
+            )
+            
+            # Conditional on the old boundary so concurrent workers cannot regress it
+            await self.conversation_repo.update_summary(
+                conversation_id,
+                new_summary.strip(),
+                previous_count=start,
+                summarized_count=start + len(messages)
+            )
+        except Exception as e:
+            logger.warning("Summarization failed for conversation %s: %s", conversation_id, e)
+        finally:
+            self._in_flight.discard(conversation_id)
+
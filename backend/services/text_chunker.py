@@ -0,0 +1,40 @@
+from typing import List
+
+class TextChunker:
+    """Splits text into overlapping windows measured in embedding-model tokens
+
+    Windows are cut on token boundaries using the tokenizer's character offsets,
+    so chunk text is an exact slice of the original document.
+    """
+    
+    def __init__(self, tokenizer, chunk_tokens: int, overlap_tokens: int):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be smaller than chunk_tokens")
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+    
+    def split(self, text: str) -> List[str]:
+        """Chunks of at most chunk_tokens tokens, consecutive chunks sharing overlap_tokens"""
+        if not text or not text.strip():
+            return []
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )
+        offsets = encoding["offset_mapping"]
+        if len(offsets) <= self.chunk_tokens:
+            return [text.strip()]
+        
+        chunks = []
+        step = self.chunk_tokens - self.overlap_tokens
+        for start in range(0, len(offsets), step):
+            end = min(start + self.chunk_tokens, len(offsets))
+            chunk = text[offsets[start][0]:offsets[end - 1][1]].strip()
+            if chunk:
+                chunks.append(chunk)
+            if end == len(offsets):
+                break
+        return chunks
@@ -0,0 +1,113 @@
+from cachetools import TTLCache
+from redis.asyncio import Redis
+from models.user import User
+from services.redis_pool import redis_pool
+from typing import Optional
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class UserCache:
+    """In-process TTL/LRU cache of User objects, invalidated across workers via Redis pub/sub"""
+    
+    CHANNEL = "user_cache:invalidate"
+    
+    def __init__(self, redis: Optional[Redis] = None):
+        self.ttl = int(os.environ.get('USER_CACHE_TTL', 60))
+        self.max_size = int(os.environ.get('USER_CACHE_MAX_SIZE', 10000))
+        self._cache = TTLCache(maxsize=self.max_size, ttl=self.ttl)
+        self.redis = redis or redis_pool.client
+        # Bumped on every invalidation so a read that raced a write is not cached
+        self._generation = 0
+        self._listener: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._remote_invalidations = 0
+    
+    @property
+    def generation(self) -> int:
+        return self._generation
+    
+    def get(self, user_id: str) -> Optional[User]:
+        """Get a cached user"""
+        user = self._cache.get(user_id)
+        if user is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+        return user
+    
+    def set(self, user: User, generation: int):
+        """Cache a user loaded when the cache was at the given generation"""
+        if generation == self._generation:
+            self._cache[user.id] = user
+    
+    def _evict(self, user_id: str):
+        self._generation += 1
+        self._cache.pop(user_id, None)
+    
+    async def invalidate(self, user_id: str):
+        """Evict a user locally and in every other worker"""
+        self._evict(user_id)
+        self._invalidations += 1
+        try:
+            await self.redis.publish(self.CHANNEL, user_id)
+        except Exception as e:
+            logger.warning("User cache invalidation publish failed: %s", e)
+    
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.CHANNEL)
+                try:
+                    # Polling with a timeout keeps reads within the pool's socket timeout
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self._evict(message["data"].decode())
+                            self._remote_invalidations += 1
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries may be stale while disconnected; drop them all
+                logger.warning("User cache invalidation listener error: %s", e)
+                self._generation += 1
+                self._cache.clear()
+                await asyncio.sleep(1)
+    
+    async def start(self):
+        """Start listening for invalidations from other workers"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self):
+        """Stop the listener"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+    
+    def get_stats(self) -> dict:
+        """Get hit-rate counters"""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "invalidations": self._invalidations,
+            "remote_invalidations": self._remote_invalidations
+        }
+
+user_cache = UserCache()
@@ -0,0 +1,104 @@
+from abc import ABC, abstractmethod
+from cachetools import LRUCache
+from typing import Optional
+import os
+import threading
+import zlib
+
+def where_filter(**conditions) -> Optional[dict]:
+    """Chroma metadata filter matching all conditions (None when there are none)"""
+    clauses = [{key: value} for key, value in conditions.items() if value is not None]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+class CollectionLayout(ABC):
+    """Maps a user to the Chroma collection holding their knowledge chunks
+    
+    Collection handles are kept in an LRU, so a request does not pay a
+    get_or_create_collection round trip to Chroma's catalog each time.
+    """
+    
+    name: str
+    
+    def __init__(self, client, cache_size: int):
+        self.client = client
+        self._handles = LRUCache(maxsize=cache_size)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    @abstractmethod
+    def collection_name(self, user_id: str) -> str:
+        """Name of the collection holding user_id's chunks"""
+    
+    @abstractmethod
+    def where(self, user_id: str, **conditions) -> Optional[dict]:
+        """Filter restricting a query, get or delete to user_id's chunks"""
+    
+    def collection(self, user_id: str):
+        """Collection for user_id, created if needed"""
+        name = self.collection_name(user_id)
+        with self._lock:
+            handle = self._handles.get(name)
+        if handle is not None:
+            self._hits += 1
+            return handle
+        self._misses += 1
+        handle = self.client.get_or_create_collection(name=name)
+        with self._lock:
+            self._handles[name] = handle
+        return handle
+    
+    def get_stats(self) -> dict:
+        return {
+            "layout": self.name,
+            "cached_handles": len(self._handles),
+            "handle_hits": self._hits,
+            "handle_misses": self._misses
+        }
+
+class PerUserLayout(CollectionLayout):
+    """One collection per user (user_<id>_knowledge); the original layout"""
+    
+    name = "per_user"
+    
+    def collection_name(self, user_id: str) -> str:
+        return f"user_{user_id}_knowledge"
+    
+    def where(self, user_id: str, **conditions) -> Optional[dict]:
+        return where_filter(**conditions)
+
+class ShardedLayout(CollectionLayout):
+    """A fixed number of shared collections; users are assigned by hash of their id
+    
+    Every chunk carries user_id in its metadata and every query filters on it,
+    so the number of collections stays constant however many users there are.
+    """
+    
+    name = "sharded"
+    
+    def __init__(self, client, cache_size: int, shards: int):
+        super().__init__(client, cache_size)
+        self.shards = shards
+    
+    def collection_name(self, user_id: str) -> str:
+        return f"knowledge_shard_{zlib.crc32(user_id.encode()) % self.shards:03d}"
+    
+    def where(self, user_id: str, **conditions) -> Optional[dict]:
+        return where_filter(user_id=user_id, **conditions)
+    
+    def get_stats(self) -> dict:
+        return {**super().get_stats(), "shards": self.shards}
+
+def create_layout(client) -> CollectionLayout:
+    """Layout for KNOWLEDGE_COLLECTION_LAYOUT: "per_user" (default) or "sharded" """
+    layout = os.environ.get('KNOWLEDGE_COLLECTION_LAYOUT', 'per_user').lower()
+    cache_size = int(os.environ.get('KNOWLEDGE_COLLECTION_CACHE_SIZE', 10000))
+    if layout == 'sharded':
+        return ShardedLayout(client, cache_size, int(os.environ.get('KNOWLEDGE_COLLECTION_SHARDS', 16)))
+    if layout != 'per_user':
+        raise ValueError(f"Unknown KNOWLEDGE_COLLECTION_LAYOUT: {layout}")
+    return PerUserLayout(client, cache_size)
@@ -1,26 +1,25 @@
-import aiohttp
+import asyncio
 import os
 from typing import Optional
 from rq import Queue
 from redis import Redis
+from services.redis_pool import redis_pool
 
 class VideoService:
     """Service for Newport AI video generation (Single Responsibility)"""
     
-    def __init__(self):
+    def __init__(self, redis: Optional[Redis] = None):
         self.api_key = os.environ.get('NEWPORT_API_KEY')
         self.base_url = "https://api.newportai.com"
-        self.redis = Redis(
-            host=os.environ.get('REDIS_HOST', 'localhost'),
-            port=int(os.environ.get('REDIS_PORT', 6379)),
-            db=0
-        )
+        # RQ is synchronous, so enqueueing runs in a worker thread
+        self.redis = redis or redis_pool.sync_client
         self.queue = Queue('video_generation', connection=self.redis)
     
     async def train_avatar(self, video_path: str, user_id: str) -> dict:
         """Train avatar with Newport AI - background job"""
         # This would be enqueued as a background job
-        job = self.queue.enqueue(
+        job = await asyncio.to_thread(
+            self.queue.enqueue,
             'workers.video_worker.train_avatar_job',
             video_path,
             user_id,
@@ -36,7 +35,8 @@ class VideoService:
         emotion: str = "neutral"
     ) -> dict:
         """Generate video with avatar speaking - background job"""
-        job = self.queue.enqueue(
+        job = await asyncio.to_thread(
+            self.queue.enqueue,
             'workers.video_worker.generate_video_job',
             avatar_id,
             text,
@@ -48,16 +48,20 @@ class VideoService:
     
     async def check_job_status(self, job_id: str) -> dict:
         """Check status of background job"""
-        from rq.job import Job
         try:
-            job = Job.fetch(job_id, connection=self.redis)
-            return {
-                "job_id": job_id,
-                "status": job.get_status(),
-                "result": job.result if job.is_finished else None,
-                "error": str(job.exc_info) if job.is_failed else None
-            }
+            return await asyncio.to_thread(self._check_job_status, job_id)
         except Exception as e:
             return {"job_id": job_id, "status": "not_found", "error": str(e)}
+    
+    def _check_job_status(self, job_id: str) -> dict:
+        """Blocking implementation of check_job_status"""
+        from rq.job import Job
+        job = Job.fetch(job_id, connection=self.redis)
+        return {
+            "job_id": job_id,
+            "status": job.get_status(),
+            "result": job.result if job.is_finished else None,
+            "error": str(job.exc_info) if job.is_failed else None
+        }
 
 video_service = VideoService()
\ No newline at end of file
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import PyPDF2
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from repositories.knowledge_repository import KnowledgeRepository
+from services.knowledge_service import knowledge_service
+
+logger = logging.getLogger(__name__)
+
+PAGE_ATTEMPTS = int(os.environ.get('KNOWLEDGE_PAGE_ATTEMPTS', 3))
+
+def count_pages(file_path: str) -> int:
+    if file_path.endswith('.pdf'):
+        return len(PyPDF2.PdfReader(file_path).pages)
+    return 1
+
+def iter_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    """(page number, text) for each page; a text file is a single page"""
+    if file_path.endswith('.pdf'):
+        reader = PyPDF2.PdfReader(file_path)
+        for number, page in enumerate(reader.pages):
+            yield number, page.extract_text() or ""
+    else:
+        yield 0, Path(file_path).read_text(encoding='utf-8')
+
+async def ingest(knowledge_repo: KnowledgeRepository, knowledge_id: str, user_id: str, file_path: str) -> dict:
+    """Chunk, embed and store an uploaded document page by page
+    
+    Runs in an RQ job, or in the API process when there is no shared Chroma
+    server (see IngestionService). PDF parsing runs in a thread, so the event
+    loop is never blocked by it.
+    """
+    entry = await knowledge_repo.find_by_id(knowledge_id)
+    if entry is None:
+        return {"status": "deleted"}
+    
+    await knowledge_repo.update(knowledge_id, {
+        "status": "processing",
+        "pages_total": await asyncio.to_thread(count_pages, file_path),
+        "error": None
+    })
+    metadata = {"title": entry.title, "source": entry.source}
+    done = set(entry.pages_done)
+    texts = []
+    failed = []
+    error = None
+    
+    pages = iter_pages(file_path)
+    while True:
+        item = await asyncio.to_thread(next, pages, None)
+        if item is None:
+            break
+        page, text = item
+        texts.append(text)
+        # Pages ingested by an earlier attempt of this job are skipped
+        if page in done:
+            continue
+        for attempt in range(PAGE_ATTEMPTS):
+            try:
+                chunk_count = await knowledge_service.add_knowledge(
+                    user_id, knowledge_id, text, metadata, page=page
+                )
+                break
+            except Exception as e:
+                error = f"page {page}: {e}"
+                logger.warning("Ingestion of %s %s failed (attempt %d)", knowledge_id, error, attempt + 1)
+                await asyncio.sleep(2 ** attempt)
+        else:
+            failed.append(page)
+            continue
+        
+        if not await knowledge_repo.record_page(knowledge_id, page, chunk_count):
+            # Deleted while ingesting; remove what this job stored
+            await knowledge_service.delete_knowledge(user_id, knowledge_id)
+            return {"status": "deleted"}
+    
+    if failed:
+        await knowledge_repo.update(knowledge_id, {
+            "status": "failed",
+            "failed_pages": failed,
+            "error": error
+        })
+        # Let RQ retry the job; the retry only processes the failed pages
+        raise RuntimeError(f"{len(failed)} pages failed: {error}")
+    
+    await knowledge_repo.update(knowledge_id, {
+        "status": "ready",
+        "content": "\n\n".join(texts),
+        "failed_pages": [],
+        "error": None
+    })
+    Path(file_path).unlink(missing_ok=True)
+    return {"status": "ready", "pages": len(texts)}
+
+async def _ingest(knowledge_id: str, user_id: str, file_path: str) -> dict:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    knowledge_repo = KnowledgeRepository(client[os.environ['DB_NAME']])
+    try:
+        # Vectors written to a local store here would never reach the API process
+        if not knowledge_service.shared_store:
+            error = "Document ingestion in a worker requires a shared Chroma server (CHROMA_HOST)"
+            await knowledge_repo.update(knowledge_id, {"status": "failed", "error": error})
+            raise RuntimeError(error)
+        return await ingest(knowledge_repo, knowledge_id, user_id, file_path)
+    finally:
+        client.close()
+
+def ingest_document_job(knowledge_id: str, user_id: str, file_path: str):
+    """
+    Background job to chunk, embed and store an uploaded document page by page
+    This runs in RQ worker process
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(_ingest(knowledge_id, user_id, file_path))
+    finally:
+        loop.close()
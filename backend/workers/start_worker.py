@@ -1,4 +1,4 @@
-from rq import Worker, Queue, Connection
+from rq import Worker
 from redis import Redis
 import os
 
@@ -10,6 +10,15 @@ redis_conn = Redis(
 )
 
 if __name__ == '__main__':
-    with Connection(redis_conn):
-        worker = Worker(['video_generation', 'digital_self', 'default'])
-        worker.work()
\ No newline at end of file
+    # Load the embedding model once; forked job processes inherit it. The
+    # Chroma client is opened in each job, never in the parent before the fork.
+    from services.knowledge_service import knowledge_service
+    knowledge_service.load_model()
+    if not knowledge_service.shared_store:
+        print("CHROMA_HOST is not set; knowledge_ingestion jobs will fail")
+    
+    worker = Worker(
+        ['knowledge_ingestion', 'video_generation', 'digital_self', 'default'],
+        connection=redis_conn
+    )
+    worker.work()
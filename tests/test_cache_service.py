@@ -0,0 +1,112 @@
+"""
+CacheService.get_or_set negative caching and @cached key binding, against an
+in-memory stand-in for Redis.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+for module in ("redis", "pydantic", "orjson"):
+    pytest.importorskip(module)
+
+from services import cache_service as cache_module  # noqa: E402
+from services.cache_service import CacheService, cache_key, cached  # noqa: E402
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.gets = 0
+    
+    def register_script(self, script):
+        async def run(keys, args):
+            return self.values.pop(keys[0], None) is not None
+        return run
+    
+    async def get(self, key):
+        self.gets += 1
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+    
+    async def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+@pytest.fixture
+def service(monkeypatch):
+    service = CacheService(redis=FakeRedis())
+    service.early_refresh_beta = 0
+    monkeypatch.setattr(cache_module, "cache_service", service)
+    return service
+
+def test_none_is_cached_for_the_negative_ttl(service):
+    calls = []
+    
+    async def loader():
+        calls.append(1)
+        return None
+    
+    async def scenario():
+        first = await service.get_or_set("cache:avatar_by_user:u1", loader, ttl=300)
+        second = await service.get_or_set("cache:avatar_by_user:u1", loader, ttl=300)
+        return first, second
+    
+    assert asyncio.run(scenario()) == (None, None)
+    assert len(calls) == 1
+
+def test_negative_caching_can_be_disabled(service):
+    service.negative_ttl = 0
+    calls = []
+    
+    async def loader():
+        calls.append(1)
+        return None
+    
+    async def scenario():
+        await service.get_or_set("cache:k", loader)
+        await service.get_or_set("cache:k", loader)
+    
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+def test_deleting_the_key_drops_a_negative_entry(service):
+    values = [None, {"id": "a1"}]
+    
+    async def loader():
+        return values.pop(0)
+    
+    async def scenario():
+        await service.get_or_set("cache:k", loader)
+        await service.delete("cache:k")
+        return await service.get_or_set("cache:k", loader)
+    
+    assert asyncio.run(scenario()) == {"id": "a1"}
+
+def test_cached_keys_positional_and_keyword_calls_alike(service):
+    class Repository:
+        def __init__(self):
+            self.calls = 0
+        
+        @cached("thing")
+        async def find(self, thing_id: str, active: bool = True):
+            self.calls += 1
+            return {"id": thing_id}
+    
+    repository = Repository()
+    
+    async def scenario():
+        await repository.find("t1")
+        await repository.find(thing_id="t1")
+        await repository.find("t1", active=True)
+    
+    asyncio.run(scenario())
+    assert repository.calls == 1
+    assert cache_key("thing", "t1", True) in service.redis.values
@@ -0,0 +1,96 @@
+"""
+ContextBuilder.build: token budget priorities and the message window.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.context_builder import CHARS_PER_TOKEN, ContextBuilder, estimate_tokens  # noqa: E402
+
+def builder(budget: int = 3000, rag_share: float = 0.4) -> ContextBuilder:
+    context_builder = ContextBuilder()
+    context_builder.token_budget = budget
+    context_builder.rag_share = rag_share
+    return context_builder
+
+def conversation(count: int, chars: int = 40) -> list:
+    return [
+        SimpleNamespace(role="user" if i % 2 == 0 else "assistant", content=f"m{i} ".ljust(chars, "x"))
+        for i in range(count)
+    ]
+
+def build(context_builder: ContextBuilder, messages: list, **overrides):
+    arguments = {
+        "personality_prompt": "You are Sam.",
+        "rag_chunks": [],
+        "summary": None,
+        "messages": messages,
+        "first_index": 0,
+        "summarized_count": 0,
+        "user_content": "What now?",
+        "max_messages": 50,
+    }
+    arguments.update(overrides)
+    return context_builder.build(**arguments)
+
+def test_everything_fits():
+    messages = conversation(6)
+    window = build(builder(), messages, rag_chunks=["fact one", "fact two"], summary="Earlier talk")
+    
+    assert [m["content"] for m in window.message_history] == [m.content for m in messages] + ["What now?"]
+    assert window.message_history[-1]["role"] == "user"
+    assert window.window_start == 0
+    assert window.rag_chunks_used == 2
+    assert "fact one\nfact two" in window.system_prompt
+    assert "Earlier talk" in window.system_prompt
+    assert window.tokens <= 3000
+
+def test_max_messages_keeps_the_newest():
+    messages = conversation(10)
+    window = build(builder(), messages, first_index=20, max_messages=4)
+    
+    assert [m["content"] for m in window.message_history[:-1]] == [m.content for m in messages[-4:]]
+    # Absolute index of the oldest kept message
+    assert window.window_start == 26
+
+def test_summarized_messages_are_not_repeated():
+    messages = conversation(10)
+    window = build(builder(), messages, first_index=20, summarized_count=23, summary="First 23 turns")
+    
+    assert [m["content"] for m in window.message_history[:-1]] == [m.content for m in messages[3:]]
+    assert window.window_start == 23
+
+def test_history_is_cut_from_the_oldest_when_over_budget():
+    messages = conversation(20, chars=200)
+    window = build(builder(budget=400), messages)
+    
+    kept = window.message_history[:-1]
+    assert 0 < len(kept) < 20
+    assert [m["content"] for m in kept] == [m.content for m in messages[-len(kept):]]
+    assert window.window_start == 20 - len(kept)
+    assert window.tokens <= 400
+
+def test_rag_is_capped_at_its_share_of_the_budget():
+    chunks = ["a" * 400, "b" * 400, "c" * 400]
+    window = build(builder(budget=1000, rag_share=0.25), [], rag_chunks=chunks)
+    
+    # 250 tokens of knowledge: two 101-token chunks fit, the third does not
+    assert window.rag_chunks_used == 2
+    assert "c" * 400 not in window.system_prompt
+
+def test_oversized_first_chunk_is_truncated():
+    window = build(builder(budget=1000, rag_share=0.1), [], rag_chunks=["z" * 4000])
+    
+    assert window.rag_chunks_used == 1
+    assert "z" * (100 * CHARS_PER_TOKEN) in window.system_prompt
+    assert "z" * (100 * CHARS_PER_TOKEN + 1) not in window.system_prompt
+
+def test_summary_is_dropped_when_it_does_not_fit():
+    summary = "s" * 4000
+    window = build(builder(budget=500), conversation(2), summary=summary)
+    
+    assert summary not in window.system_prompt
+    assert estimate_tokens(summary) > 500
+    assert len(window.message_history) == 3
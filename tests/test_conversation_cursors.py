@@ -0,0 +1,107 @@
+"""
+Pagination cursors: round trips, and tampered cursors rejected with ValueError
+(which the routes turn into 400) instead of reaching the query.
+The messages collection is an in-memory fake, so no MongoDB is needed.
+"""
+import asyncio
+import base64
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+for module in ("motor", "pymongo", "pydantic", "redis", "orjson"):
+    pytest.importorskip(module)
+
+from repositories.conversation_repository import (  # noqa: E402
+    ConversationRepository, decode_cursor, encode_cursor
+)
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+    
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+    
+    async def to_list(self, length):
+        return [dict(doc) for doc in self.docs[:length]]
+
+class FakeMessages:
+    """Supports the conversation_id / seq $lt queries get_messages_before makes"""
+    
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+    
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        docs = [doc for doc in self.docs if doc["conversation_id"] == query["conversation_id"]]
+        if "seq" in query:
+            docs = [doc for doc in docs if doc["seq"] < query["seq"]["$lt"]]
+        return FakeCursor([{k: v for k, v in doc.items() if k != "conversation_id"} for doc in docs])
+
+class FakeDb:
+    def __init__(self, messages):
+        self.conversations = None
+        self.messages = messages
+
+def repository(count: int = 7) -> ConversationRepository:
+    docs = [
+        {"conversation_id": "c1", "id": f"m{seq}", "seq": seq, "role": "user", "content": f"message {seq}"}
+        for seq in range(count)
+    ]
+    return ConversationRepository(FakeDb(FakeMessages(docs)))
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2026-01-01T00:00:00+00:00", "abc")) == ["2026-01-01T00:00:00+00:00", "abc"]
+    assert decode_cursor(encode_cursor(42)) == [42]
+
+@pytest.mark.parametrize("cursor", ["not base64 !", raw_cursor({"seq": 1}), raw_cursor(5), "e30"])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_pages_walk_back_to_the_start():
+    repo = repository(7)
+    seqs = []
+    cursor = None
+    while True:
+        messages, cursor = asyncio.run(repo.get_messages_before("c1", cursor, limit=3))
+        seqs = [message.seq for message in messages] + seqs
+        if cursor is None:
+            break
+    assert seqs == list(range(7))
+
+def test_numeric_string_cursor_is_accepted():
+    repo = repository(7)
+    messages, _ = asyncio.run(repo.get_messages_before("c1", raw_cursor(["4"]), limit=10))
+    assert [message.seq for message in messages] == [0, 1, 2, 3]
+
+@pytest.mark.parametrize("value", [
+    [{"$gt": 0}],
+    [[1]],
+    [True],
+    [None],
+    ["-1"],
+    ["1.5"],
+    [1.5],
+    [1, 2],
+    [],
+])
+def test_tampered_message_cursor_is_rejected(value):
+    repo = repository()
+    with pytest.raises(ValueError):
+        asyncio.run(repo.get_messages_before("c1", raw_cursor(value), limit=3))
+    assert repo.messages.queries == []
@@ -0,0 +1,57 @@
+"""
+The int8 ONNX embedder must stay close enough to the PyTorch model that
+switching EMBEDDING_BACKEND does not change retrieval results.
+Skipped when onnxruntime / sentence-transformers or the model are unavailable.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from services.embedders import OnnxEmbedder, SentenceTransformerEmbedder  # noqa: E402
+
+MODEL = "all-MiniLM-L6-v2"
+ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+TOLERANCE = 0.98
+
+TEXTS = [
+    "hi",
+    "What did I say about moving to Berlin last year?",
+    "Remind me what my favourite books are.",
+    "The quarterly report shows revenue grew by twelve percent while costs stayed flat.",
+    "I usually go running in the morning before work, around six.",
+    "Can you summarize the document I uploaded about the marketing plan?",
+    "My sister's wedding is in June and I'm giving a speech. " * 40,
+]
+
+@pytest.fixture(scope="module")
+def embedders():
+    torch_embedder = SentenceTransformerEmbedder(MODEL)
+    onnx_embedder = OnnxEmbedder(MODEL, ONNX_FILE)
+    try:
+        torch_embedder.load()
+        onnx_embedder.load()
+    except Exception as e:
+        pytest.skip(f"embedding model unavailable: {e}")
+    return torch_embedder, onnx_embedder
+
+def test_onnx_matches_torch_per_text(embedders):
+    torch_embedder, onnx_embedder = embedders
+    reference = torch_embedder.encode(TEXTS, batch_size=4)
+    candidate = onnx_embedder.encode(TEXTS, batch_size=4)
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+    similarity = np.sum(reference * candidate, axis=1)
+    for text, value in zip(TEXTS, similarity):
+        assert value >= TOLERANCE, f"cosine {value:.4f} < {TOLERANCE} for {text[:40]!r}"
+
+def test_onnx_output_is_normalized(embedders):
+    _, onnx_embedder = embedders
+    norms = np.linalg.norm(onnx_embedder.encode(TEXTS), axis=1)
+    assert np.allclose(norms, 1.0, atol=1e-5)
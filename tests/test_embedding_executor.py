@@ -0,0 +1,94 @@
+"""
+EmbeddingExecutor batching and failure handling, with a plain function as the encoder.
+"""
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+np = pytest.importorskip("numpy")
+
+from services.embedding_executor import EmbeddingExecutor  # noqa: E402
+
+def lengths(texts):
+    return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_concurrent_calls_share_a_batch():
+    async def scenario():
+        executor = EmbeddingExecutor(lengths)
+        try:
+            results = await asyncio.gather(executor.encode(["a", "bb"]), executor.encode(["ccc"]))
+            return results, executor.get_stats()
+        finally:
+            await executor.stop()
+    
+    (first, second), stats = run(scenario())
+    assert first[:, 0].tolist() == [1, 2]
+    assert second[:, 0].tolist() == [3]
+    assert stats["batches"] == 1
+
+def test_failed_batch_only_fails_its_callers():
+    def encode(texts):
+        if "bad" in texts:
+            raise ValueError("boom")
+        return lengths(texts)
+    
+    async def scenario():
+        executor = EmbeddingExecutor(encode)
+        try:
+            with pytest.raises(ValueError):
+                await executor.encode(["bad"])
+            return await executor.encode(["ok"])
+        finally:
+            await executor.stop()
+    
+    assert run(scenario())[:, 0].tolist() == [2]
+
+def test_dead_batching_task_fails_waiters_and_restarts():
+    async def scenario():
+        executor = EmbeddingExecutor(lengths)
+        collect = executor._collect
+        
+        async def broken():
+            # Dies after taking a request off the queue, once
+            executor._collect = collect
+            await collect()
+            raise KeyError("dead")
+        
+        executor._collect = broken
+        try:
+            with pytest.raises(KeyError):
+                await asyncio.wait_for(executor.encode(["lost"]), 1)
+            result = await asyncio.wait_for(executor.encode(["back"]), 1)
+            return result, executor.get_stats()
+        finally:
+            await executor.stop()
+    
+    result, stats = run(scenario())
+    assert result[:, 0].tolist() == [4]
+    assert stats["restarts"] == 1
+
+def test_stop_fails_the_batch_in_flight():
+    release = threading.Event()
+    
+    def slow(texts):
+        release.wait(1)
+        return lengths(texts)
+    
+    async def scenario():
+        executor = EmbeddingExecutor(slow)
+        pending = asyncio.ensure_future(executor.encode(["running"]))
+        await asyncio.sleep(0.05)
+        await executor.stop()
+        release.set()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pending, 1)
+    
+    run(scenario())
@@ -0,0 +1,99 @@
+"""
+ResponseCache scoping: a reply is only served for the same prompt, retrieved
+context and conversation. Embeddings are passed in, so no model is needed.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+np = pytest.importorskip("numpy")
+for module in ("redis", "cachetools", "pydantic", "orjson"):
+    pytest.importorskip(module)
+
+from services import response_cache as response_cache_module  # noqa: E402
+from services.response_cache import ResponseCache  # noqa: E402
+
+HISTORY_A = [
+    {"role": "user", "content": "Should I take the Berlin job?"},
+    {"role": "assistant", "content": "Yes, the team sounds great."},
+]
+HISTORY_B = [
+    {"role": "user", "content": "Should I adopt a cat?"},
+    {"role": "assistant", "content": "Yes, if you have the time."},
+]
+
+@pytest.fixture(autouse=True)
+def no_embedding_model(monkeypatch):
+    async def embed_query(text):
+        raise AssertionError("the query embedding should be reused, not recomputed")
+    monkeypatch.setattr(response_cache_module.knowledge_service, "embed_query", embed_query)
+
+def vector(seed: int) -> "np.ndarray":
+    values = np.random.default_rng(seed).standard_normal(384).astype(np.float32)
+    return values / np.linalg.norm(values)
+
+def cache() -> ResponseCache:
+    response_cache = ResponseCache()
+    response_cache.enabled = True
+    response_cache.semantic_enabled = True
+    return response_cache
+
+def probe(response_cache, question="Why?", history=HISTORY_A, summary=None,
+          personality="You are Sam.", rag="", embedding=None):
+    return response_cache.probe(
+        "user-1", question, personality, rag,
+        history=history, summary=summary,
+        embedding=vector(1) if embedding is None else embedding
+    )
+
+def store(response_cache, reply="Because the team is great.", **kwargs):
+    response_cache.set(probe(response_cache, **kwargs), reply)
+
+def lookup(response_cache, **kwargs):
+    return asyncio.run(response_cache.get(probe(response_cache, **kwargs)))
+
+def test_same_conversation_hits():
+    response_cache = cache()
+    store(response_cache)
+    assert lookup(response_cache, question="why") == "Because the team is great."
+
+def test_follow_up_in_another_conversation_misses():
+    response_cache = cache()
+    store(response_cache)
+    # Same question, same vector, same prompt and context: only the history differs
+    assert lookup(response_cache, history=HISTORY_B) is None
+
+def test_first_turn_does_not_match_a_follow_up():
+    response_cache = cache()
+    store(response_cache)
+    assert lookup(response_cache, history=[]) is None
+
+def test_summary_is_part_of_the_scope():
+    response_cache = cache()
+    store(response_cache, summary="Talked about moving abroad")
+    assert lookup(response_cache, summary="Talked about pets") is None
+    assert lookup(response_cache, summary="Talked about moving abroad") is not None
+
+def test_prompt_and_context_are_part_of_the_scope():
+    response_cache = cache()
+    store(response_cache, rag="Sam works in Munich")
+    assert lookup(response_cache, rag="Sam works in Paris") is None
+    assert lookup(response_cache, rag="Sam works in Munich", personality="You are Alex.") is None
+
+def test_semantic_match_within_scope_uses_the_given_embedding():
+    response_cache = cache()
+    store(response_cache, question="Why should I take it?", embedding=vector(1))
+    close = vector(1) + 0.01 * vector(2)
+    assert lookup(response_cache, question="So why take it", embedding=close) is not None
+    assert lookup(response_cache, question="So why take it", embedding=vector(3)) is None
+    assert response_cache.get_stats()["semantic_hits"] == 1
+
+def test_invalidate_user_drops_replies():
+    response_cache = cache()
+    store(response_cache)
+    response_cache.invalidate_user("user-1")
+    assert lookup(response_cache) is None
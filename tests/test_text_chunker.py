@@ -0,0 +1,85 @@
+"""
+TextChunker windows: size, overlap and exact slicing of the source text.
+A whitespace tokenizer stands in for the Hugging Face one, so no model is needed.
+"""
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from services.text_chunker import TextChunker  # noqa: E402
+
+class WordTokenizer:
+    """One token per whitespace-separated word, with character offsets"""
+    
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False, verbose=True):
+        return {"offset_mapping": [match.span() for match in re.finditer(r"\S+", text)]}
+    
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+def words(count: int) -> str:
+    return " ".join(f"w{i}" for i in range(count))
+
+def test_empty_and_blank_text_have_no_chunks():
+    chunker = TextChunker(WordTokenizer(), chunk_tokens=10, overlap_tokens=2)
+    assert chunker.split("") == []
+    assert chunker.split("   \n ") == []
+
+def test_short_text_is_one_stripped_chunk():
+    chunker = TextChunker(WordTokenizer(), chunk_tokens=10, overlap_tokens=2)
+    assert chunker.split("  hello there  ") == ["hello there"]
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        TextChunker(WordTokenizer(), chunk_tokens=5, overlap_tokens=5)
+
+def test_chunks_respect_size_and_share_overlap():
+    chunker = TextChunker(WordTokenizer(), chunk_tokens=10, overlap_tokens=3)
+    chunks = chunker.split(words(45))
+    
+    tokens = [chunk.split() for chunk in chunks]
+    assert all(len(chunk) <= 10 for chunk in tokens)
+    for previous, current in zip(tokens, tokens[1:]):
+        assert previous[-3:] == current[:3]
+    # Every word is covered, in order, and the last chunk ends the text
+    assert tokens[0][0] == "w0"
+    assert tokens[-1][-1] == "w44"
+    covered = tokens[0] + [word for chunk in tokens[1:] for word in chunk[3:]]
+    assert covered == words(45).split()
+
+def test_chunks_are_exact_slices_of_the_text():
+    text = "Alpha  beta,\ngamma delta.\n\nEpsilon zeta eta   theta iota kappa lambda"
+    chunker = TextChunker(WordTokenizer(), chunk_tokens=4, overlap_tokens=1)
+    chunks = chunker.split(text)
+    
+    assert len(chunks) > 1
+    offset = 0
+    for chunk in chunks:
+        # Original spacing and newlines inside a chunk are kept
+        start = text.index(chunk, offset)
+        assert text[start:start + len(chunk)] == chunk
+        offset = start + 1
+    assert "Alpha  beta,\ngamma delta." in chunks[0]
+
+def test_knowledge_chunker_leaves_room_for_special_tokens():
+    pytest.importorskip("numpy")
+    pytest.importorskip("redis")
+    pytest.importorskip("cachetools")
+    pytest.importorskip("pydantic")
+    from services.knowledge_service import KnowledgeService
+    
+    class FakeEmbedder:
+        name = "fake"
+        tokenizer = WordTokenizer()
+        max_seq_length = 12
+    
+    service = KnowledgeService()
+    service.embedder = FakeEmbedder()
+    service.chunk_tokens = 200
+    service.chunk_overlap = 2
+    # 12 positions minus [CLS] and [SEP]
+    assert service.chunker.chunk_tokens == 10